@@ -11,6 +11,15 @@ from collections import deque
 from bisect import bisect
 from copy import deepcopy
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from mfd_presolve import propagate_intervals
+from mfd_pruning import prune_subpaths
+
+threads = 0
+lazy_subpaths = False
+prune = False
+presolve = False
+
 
 def get_edge(raw_edge):
 
@@ -88,6 +97,10 @@ def read_subpaths(safe_file):
 def mfd_algorithm(data):
 
     data['message'] = 'unsolved'
+    data['weights'], data['solution'] = list(), list()
+    if presolve and not propagate_intervals(data):
+        # no flow fits the intervals, every number of paths is infeasible
+        return data
     for i in range(2, len(data['graph'].edges) + 1):
         if fd_fixed_size(data, i)['message'] == 'solved':
             return data
@@ -95,22 +108,20 @@ def mfd_algorithm(data):
     return data
 
 
-def build_base_ilp_model(data, size):
+def build_base_ilp_model(data, size, subpaths):
 
     graph = data['graph']
-    max_flow_value = data['max_flow_value']
     sources = data['sources']
     sinks = data['sinks']
     lower = data['lower flow']
     upper = data['upper flow']
     subpath = data['subpath']
-    subpathNumber = subpath['n']
     subpathEdges = subpath['paths']    
 
     # create extra sets
     T = [(u, v, i, k) for (u, v, i) in graph.edges(keys=True) for k in range(size)]
     SC = list(range(size))
-    R = [(k,s) for k in range(0,size) for s in range(0,subpathNumber)]
+    R = [(k,s) for k in range(0,size) for s in subpaths]
 
     # Create a new model
     model = gp.Model('MFD')
@@ -118,9 +129,12 @@ def build_base_ilp_model(data, size):
     model.setParam('Threads', threads)
 
 
+    # big-M values: the upper flow of every edge, and for the weights the largest upper flow out of a source
+    weight_bound = max(upper[u, v] for u in sources for _, v in graph.out_edges(u))
+
     # Create variables
     x = model.addVars(T, vtype=GRB.BINARY, name='x')
-    w = model.addVars(SC, vtype=GRB.INTEGER, name='w', lb=1)
+    w = model.addVars(SC, vtype=GRB.INTEGER, name='w', lb=1, ub=weight_bound)
     z = model.addVars(T, vtype=GRB.CONTINUOUS, name='z', lb=0)
     r = model.addVars(R, vtype=GRB.BINARY,name='r')
 
@@ -134,23 +148,26 @@ def build_base_ilp_model(data, size):
             if v not in sources and v not in sinks:
                 model.addConstr(sum(x[v, w, i, k] for _, w, i in graph.out_edges(v, keys=True)) - sum(x[u, v, i, k] for u, _, i in graph.in_edges(v, keys=True)) == 0)
 
-    # inexact flow balance
+    # inexact flow balance, one exact row for the edges with equal lower and upper flow
     for (u, v, i, f) in graph.edges(keys=True, data='flow'):
-        model.addConstr(lower[u,v] <= sum(z[u, v, i, k] for k in range(size)))
-        model.addConstr(upper[u,v] >= sum(z[u, v, i, k] for k in range(size)))
+        if lower[u,v] == upper[u,v]:
+            model.addConstr(lower[u,v] == sum(z[u, v, i, k] for k in range(size)))
+        else:
+            model.addConstr(lower[u,v] <= sum(z[u, v, i, k] for k in range(size)))
+            model.addConstr(upper[u,v] >= sum(z[u, v, i, k] for k in range(size)))
 
     # supbatph constraints
     for k in range(0,size):
-        for s in range(0,subpathNumber):
+        for s in subpaths:
             model.addConstr(sum(x[u,v,0,k] for (u,v) in subpathEdges[s]) >= len(subpathEdges[s])*r[k,s])
     
-    model.addConstrs(sum(r[k,s] for k in range(0,size)) >= 1 for s in range(0,len(subpath['paths'])))
+    model.addConstrs(sum(r[k,s] for k in range(0,size)) >= 1 for s in subpaths)
            
     # linearization
     for (u, v, i) in graph.edges(keys=True):
         for k in range(size):
-            model.addConstr(z[u, v, i, k] <= max_flow_value * x[u, v, i, k])
-            model.addConstr(w[k] - (1 - x[u, v, i, k]) * max_flow_value <= z[u, v, i, k])
+            model.addConstr(z[u, v, i, k] <= upper[u,v] * x[u, v, i, k])
+            model.addConstr(w[k] - (1 - x[u, v, i, k]) * weight_bound <= z[u, v, i, k])
             model.addConstr(z[u, v, i, k] <= w[k])
 
     return model, x, w, z
@@ -192,19 +209,38 @@ def update_status(data, model):
     return data
 
 
+def uncovered_subpaths(data, subpaths):
+
+    # the subpaths not in the model that no path of the solution contains
+    subpath = data['subpath']
+    modelled = set(subpaths)
+    edges = [{(u, v) for (u, v, i) in path} for path in data['solution']]
+
+    return [s for s in range(0,len(subpath['paths'])) if s not in modelled and not any(set(subpath['paths'][s]) <= e for e in edges)]
+
+
 def fd_fixed_size(data, size):
 
     # calculate a flow decomposition into size paths
     try:
-        # Create a new model
-        model, _, _, _ = build_base_ilp_model(data, size)
+        # with --lazy-subpaths, the model only has the subpaths the solutions did not
+        # cover so far, and it is built and solved again until all are covered
+        subpaths = data.setdefault('lazy subpaths', list()) if lazy_subpaths else list(range(0,len(data['subpath']['paths'])))
+        while True:
+            # Create a new model
+            model, _, _, _ = build_base_ilp_model(data, size, subpaths)
+
 
+            # objective function
+            model.optimize()
 
-        # objective function
-        model.optimize()
+            data = update_status(data, model)
+            data = get_solution(model, data, size)
 
-        data = update_status(data, model)
-        data = get_solution(model, data, size)
+            violated = uncovered_subpaths(data, subpaths) if lazy_subpaths and data['solution'] else list()
+            if not violated:
+                break
+            subpaths += violated
 
     except gp.GurobiError as e:
         print(f'Error code {e.errno}: {e}', file=sys.stderr)
@@ -275,7 +311,14 @@ def solve_instances(graphs,subpath,output_file, output_stats=False):
 
         if len(mfd['graph'].edges) > 0:
             mfd['subpath'] = subpath[g]
+            if prune:
+                mfd['subpath'] = prune_subpaths(subpath[g])
+                print(f"INFO: {len(subpath[g]['paths']) - len(mfd['subpath']['paths'])} of {len(subpath[g]['paths'])} subpaths pruned for graph {g}")
             mfd = mfd_algorithm(mfd)
+            if 'presolve' in mfd and mfd['presolve']['infeasible']:
+                print(f"INFO: No flow within the intervals of graph {g}")
+            elif mfd['message'] != 'solved':
+                print(f"INFO: No decomposition found for graph {g} ({mfd['message']})")
             paths,weights = mfd['solution'],mfd['weights']
             output_paths(output,paths,weights)
 
@@ -294,6 +337,12 @@ if __name__ == '__main__':
     )
     parser.add_argument('-t', '--threads', type=int, default=0,
                         help='Number of threads to use for the Gurobi solver; use 0 for all threads (default 0).')
+    parser.add_argument('-pr', '--prune', action='store_true',
+                        help='Drop the subpaths whose edges are all in another subpath (duplicates and parts of longer subpaths) before building the ILP.')
+    parser.add_argument('-ps', '--presolve', action='store_true',
+                        help='Tighten the lower and upper flow of every edge by flow conservation before building the ILP: inputs without any flow within the intervals are skipped, edges with equal bounds get exact rows, and the tighter upper flows are used as big-M.')
+    parser.add_argument('-ls', '--lazy-subpaths', action='store_true',
+                        help='Solve every size without the subpath constraints first, and add the constraints of the subpaths the solution does not cover, solving again until all are covered.')
  
     requiredNamed = parser.add_argument_group('required arguments')
     requiredNamed.add_argument('-i', '--input', type=str, help='Input filename', required=True)
@@ -306,6 +355,9 @@ if __name__ == '__main__':
     if threads == 0:
         threads = os.cpu_count()
     print(f'INFO: Using {threads} threads for the Gurobi solver')
+    lazy_subpaths = args.lazy_subpaths
+    prune = args.prune
+    presolve = args.presolve
 
     solve_instances(read_input(args.input),read_subpaths(args.subpaths),args.output)
     print("Done")
@@ -95,6 +95,20 @@ def read_subpaths(safe_file):
     paths = open(safe_file,'r').read().split('#')[1:]
     return [get_subpath(paths_raw) for paths_raw in paths]
 
+def prune_subpaths(subpath):
+
+    # only exact duplicates (same edges and same weight) are dropped: every subpath needs its own
+    # set of paths with its weight, so neither a subpath contained in another one nor one with the
+    # same edges and another weight is implied, and their weights cannot be summed
+    seen, kept = set(), list()
+    for s in range(0,len(subpath['paths'])):
+        key = (subpath['weights'][s], frozenset(subpath['paths'][s]))
+        if key not in seen:
+            seen.add(key)
+            kept.append(s)
+
+    return dict(subpath, n=len(kept), weights=[subpath['weights'][s] for s in kept], paths=[subpath['paths'][s] for s in kept])
+
 def mfd_algorithm(data):
 
     data['message'] = 'unsolved'
@@ -105,23 +119,21 @@ def mfd_algorithm(data):
     return data
 
 
-def build_base_ilp_model(data, size):
+def build_base_ilp_model(data, size, subpaths):
 
     graph = data['graph']
-    max_flow_value = data['max_flow_value']
     sources = data['sources']
     sinks = data['sinks']
     lower = data['lower flow']
     upper = data['upper flow']
     subpath = data['subpath']
-    subpathNumber = subpath['n']
     subpathEdges = subpath['paths']    
     subpathWeights = subpath['weights']
 
     # create extra sets
     T = [(u, v, i, k) for (u, v, i) in graph.edges(keys=True) for k in range(size)]
     SC = list(range(size))
-    R = [(k,s) for k in range(0,size) for s in range(0,subpathNumber)]
+    R = [(k,s) for k in range(0,size) for s in subpaths]
 
     # Create a new model
     model = gp.Model('MFD')
@@ -129,9 +141,12 @@ def build_base_ilp_model(data, size):
     model.setParam('Threads', threads)
 
 
+    # big-M values: the upper flow of every edge, and for the weights the largest upper flow out of a source
+    weight_bound = max(upper[u, v] for u in sources for _, v in graph.out_edges(u))
+
     # Create variables
     x = model.addVars(T, vtype=GRB.BINARY, name='x')
-    w = model.addVars(SC, vtype=GRB.INTEGER, name='w', lb=1)
+    w = model.addVars(SC, vtype=GRB.INTEGER, name='w', lb=1, ub=weight_bound)
     z = model.addVars(T, vtype=GRB.CONTINUOUS, name='z', lb=0)
     r = model.addVars(R, vtype=GRB.BINARY,name='r')
     b = model.addVars(R, vtype=GRB.CONTINUOUS,name='b')
@@ -153,26 +168,26 @@ def build_base_ilp_model(data, size):
 
     # supbatph constraints
     for k in range(0,size):
-        for s in range(0,subpathNumber):
+        for s in subpaths:
             model.addConstr(sum(x[u,v,0,k] for (u,v) in subpathEdges[s]) >= len(subpathEdges[s])*r[k,s])
     
-    model.addConstrs(sum(r[k,s] for k in range(0,size)) >= 1 for s in range(0,len(subpath['paths'])))
+    model.addConstrs(sum(r[k,s] for k in range(0,size)) >= 1 for s in subpaths)
 
      # subpath weights constraints
-    model.addConstrs(sum(b[k,s] for k in range(0,size)) == subpathWeights[s] for s in range(0,len(subpath['paths'])))
+    model.addConstrs(sum(b[k,s] for k in range(0,size)) == subpathWeights[s] for s in subpaths)
 
     # linearization r*w
     for k in range(0,size):
-            for s in range(0,len(subpath['paths'])):
-                model.addConstr(b[k,s] <= 1e6*r[k,s])
-                model.addConstr(w[k] - (1 - r[k,s])*1e6 <= b[k,s])
+            for s in subpaths:
+                model.addConstr(b[k,s] <= subpathWeights[s]*r[k,s])
+                model.addConstr(w[k] - (1 - r[k,s])*weight_bound <= b[k,s])
                 model.addConstr(b[k,s] <= w[k])
            
     # linearization
     for (u, v, i) in graph.edges(keys=True):
         for k in range(size):
-            model.addConstr(z[u, v, i, k] <= max_flow_value * x[u, v, i, k])
-            model.addConstr(w[k] - (1 - x[u, v, i, k]) * max_flow_value <= z[u, v, i, k])
+            model.addConstr(z[u, v, i, k] <= upper[u,v] * x[u, v, i, k])
+            model.addConstr(w[k] - (1 - x[u, v, i, k]) * weight_bound <= z[u, v, i, k])
             model.addConstr(z[u, v, i, k] <= w[k])
 
     return model, x, w, z
@@ -214,19 +229,48 @@ def update_status(data, model):
     return data
 
 
+def uncovered_subpaths(data, subpaths):
+
+    # the subpaths not in the model whose weight is not the sum of the weights of some of the paths containing them
+    subpath = data['subpath']
+    modelled = set(subpaths)
+    edges = [{(u, v) for (u, v, i) in path} for path in data['solution']]
+    uncovered = list()
+    for s in range(0,len(subpath['paths'])):
+        if s in modelled:
+            continue
+        sums = set()
+        for k in range(len(edges)):
+            if set(subpath['paths'][s]) <= edges[k]:
+                sums |= {data['weights'][k]} | {t + data['weights'][k] for t in sums}
+        if subpath['weights'][s] not in sums:
+            uncovered.append(s)
+
+    return uncovered
+
+
 def fd_fixed_size(data, size):
 
     # calculate a flow decomposition into size paths
     try:
-        # Create a new model
-        model, _, _, _ = build_base_ilp_model(data, size)
+        # with --lazy-subpaths, the model only has the subpaths the solutions did not
+        # cover so far, and it is built and solved again until all are covered
+        subpaths = data.setdefault('lazy subpaths', list()) if lazy_subpaths else list(range(0,len(data['subpath']['paths'])))
+        while True:
+            # Create a new model
+            model, _, _, _ = build_base_ilp_model(data, size, subpaths)
+
 
+            # objective function
+            model.optimize()
 
-        # objective function
-        model.optimize()
+            data = update_status(data, model)
+            data = get_solution(model, data, size)
 
-        data = update_status(data, model)
-        data = get_solution(model, data, size)
+            violated = uncovered_subpaths(data, subpaths) if lazy_subpaths and data['solution'] else list()
+            if not violated:
+                break
+            subpaths += violated
 
     except gp.GurobiError as e:
         print(f'Error code {e.errno}: {e}', file=sys.stderr)
@@ -297,6 +341,9 @@ def solve_instances(graphs,subpath,output_file, output_stats=False):
 
         if len(mfd['graph'].edges) > 0:
             mfd['subpath'] = subpath[g]
+            if prune:
+                mfd['subpath'] = prune_subpaths(subpath[g])
+                print(f"INFO: {len(subpath[g]['paths']) - len(mfd['subpath']['paths'])} of {len(subpath[g]['paths'])} subpaths pruned for graph {g}")
             mfd = mfd_algorithm(mfd)
             paths,weights = mfd['solution'],mfd['weights']
             output_paths(output,paths,weights)
@@ -316,6 +363,10 @@ if __name__ == '__main__':
     )
     parser.add_argument('-t', '--threads', type=int, default=0,
                         help='Number of threads to use for the Gurobi solver; use 0 for all threads (default 0).')
+    parser.add_argument('-pr', '--prune', action='store_true',
+                        help='Drop the subpaths with the same edges and weight as another subpath before building the ILP.')
+    parser.add_argument('-ls', '--lazy-subpaths', action='store_true',
+                        help='Solve every size without the subpath constraints first, and add the constraints of the subpaths the solution does not cover, solving again until all are covered.')
  
     requiredNamed = parser.add_argument_group('required arguments')
     requiredNamed.add_argument('-i', '--input', type=str, help='Input filename', required=True)
@@ -328,6 +379,8 @@ if __name__ == '__main__':
     if threads == 0:
         threads = os.cpu_count()
     print(f'INFO: Using {threads} threads for the Gurobi solver')
+    lazy_subpaths = args.lazy_subpaths
+    prune = args.prune
 
     solve_instances(read_input(args.input),read_subpaths(args.subpaths),args.output)
     print("Done")
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import subprocess
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'MFD with Cycles'))
+import mfd_standard
+import mfd_inexact
+import mfd_pc
+from mfd_backend import BACKENDS, backend_available
+from mfd_search import SEARCH_STRATEGIES
+from mfd_bounds import LINEARIZATIONS
+from mfd_batch import read_blocks
+from mfd_generate import random_flows, format_graph, WEIGHT_DISTRIBUTIONS
+
+## Benchmark of one solver over an input file or over random flows (mfd_generate.py).
+## For every graph it records the time to parse the graph and to compute its metadata,
+## and for every number of paths K tried by the search the time to build the model,
+## solve it and extract the solution. The results are written as CSV (one row per K,
+## with the columns of the graph repeated) or as JSON (one object per graph, with the
+## list of the K tried), both labelled with the version of the code, by default its
+## git commit, so that runs of different versions can be compared.
+
+SCRIPTS = {'standard': mfd_standard, 'inexact': mfd_inexact, 'pc': mfd_pc}
+
+COLUMNS = ['label', 'instance', 'script', 'backend', 'nodes', 'edges', 'width', 'paths', 'status', 'parse', 'metadata', 'total',
+           'size', 'size status', 'build', 'solve', 'extract']
+
+
+def code_version():
+
+    try:
+        folder = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=folder, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def instances(args):
+
+    # (name, raw graph, number of paths overlaid or None)
+    if args.input:
+        for g, raw_graph in enumerate(read_blocks(args.input)):
+            yield f'{os.path.basename(args.input)}:{g}', raw_graph, None
+        return
+
+    flows = random_flows(args.seed, args.graphs, args.nodes, args.paths, args.length, args.weights, args.max_weight, args.cycles)
+    for g, graph in enumerate(flows):
+        yield f'random-{args.seed}-{g}', format_graph(graph), len(graph['paths'])
+
+
+def run_graph(script, name, raw_graph, width):
+
+    start = time.perf_counter()
+    graph = script.get_graph(raw_graph)
+    parse = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = script.compute_graph_metadata(graph)
+    metadata = time.perf_counter() - start
+
+    result = {'instance': name, 'nodes': data['graph'].number_of_nodes(), 'edges': data['graph'].number_of_edges(), 'width': width,
+              'paths': None, 'status': 'empty', 'parse': parse, 'metadata': metadata, 'total': 0, 'sizes': list()}
+    if len(data['graph'].edges) == 0:
+        return result
+
+    start = time.perf_counter()
+    data = script.mfd_algorithm(data)
+    result['total'] = time.perf_counter() - start
+
+    result['status'] = data['message']
+    result['paths'] = len(data['solution']) if data['solution'] else None
+    sizes = data['search']['sizes']
+    result['sizes'] = [{'size': size, 'size status': sizes.get(size, 'unsolved'), 'build': build, 'solve': solve, 'extract': extract}
+                       for size, build, solve, extract in data['timings']]
+
+    return result
+
+
+def write_csv(output, label, script, backend, results):
+
+    writer = csv.DictWriter(output, fieldnames=COLUMNS)
+    writer.writeheader()
+    for result in results:
+        row = {key: value for key, value in result.items() if key != 'sizes'}
+        row.update({'label': label, 'script': script, 'backend': backend})
+        for size in result['sizes'] or [dict()]:
+            writer.writerow(dict(row, **size))
+        output.flush()
+
+
+def write_json(output, label, script, backend, options, results):
+
+    json.dump({'label': label, 'script': script, 'backend': backend, 'options': options, 'graphs': list(results)}, output, indent=1)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''
+        Benchmarks a solver on an input file or on random flows, with the parse, metadata,
+        model build, solve and solution extraction times of every graph and number of paths.
+        ''',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument('-i', '--input', type=str,
+                        help='Input filename (default random flows).')
+    parser.add_argument('-sc', '--script', type=str, choices=list(SCRIPTS),
+                        help='Solver to benchmark (default pc for random flows with cycles, standard otherwise).')
+    parser.add_argument('-g', '--graphs', type=int, default=20,
+                        help='Number of random flows (default 20).')
+    parser.add_argument('-n', '--nodes', type=int, default=50,
+                        help='Number of nodes of the random flows (default 50).')
+    parser.add_argument('-k', '--paths', type=int, default=8,
+                        help='Largest number of paths overlaid into a random flow (default 8).')
+    parser.add_argument('-l', '--length', type=int, default=6,
+                        help='Largest number of inner nodes of a random path or cycle (default 6).')
+    parser.add_argument('-c', '--cycles', type=int, default=0,
+                        help='Number of cycles overlaid into every random flow (default 0).')
+    parser.add_argument('-wd', '--weights', type=str, default='uniform', choices=WEIGHT_DISTRIBUTIONS,
+                        help='Distribution of the random path weights (default uniform).')
+    parser.add_argument('-mw', '--max-weight', type=int, default=100,
+                        help='Largest random path weight (default 100).')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='Seed of the random flows (default 0).')
+    parser.add_argument('-b', '--backend', type=str, default='gurobi', choices=BACKENDS,
+                        help='ILP solver (default gurobi).')
+    parser.add_argument('-t', '--threads', type=int, default=1,
+                        help='Number of threads to use for each ILP solve (default 1).')
+    parser.add_argument('-ss', '--search', type=str, default='binary', choices=SEARCH_STRATEGIES,
+                        help='Strategy to search the number of paths (default binary).')
+    parser.add_argument('-tl', '--time-limit', type=float,
+                        help='Time limit in seconds for each ILP solve (default none).')
+    parser.add_argument('-gtl', '--graph-time-limit', type=float,
+                        help='Time limit in seconds for each graph (default none).')
+    parser.add_argument('-inc', '--incremental', action='store_true',
+                        help='Keep one ILP model across sizes.')
+    parser.add_argument('-mx', '--matrix', action='store_true',
+                        help='Build the constraints of every path from sparse matrices.')
+    parser.add_argument('-lz', '--linearization', type=str, default='edge', choices=LINEARIZATIONS,
+                        help='Linearization of the weight of every path (default edge).')
+    parser.add_argument('-fm', '--formulation', type=str, default='order', choices=mfd_pc.FORMULATIONS,
+                        help='Formulation of the paths and cycles (pc solver only, default order).')
+    parser.add_argument('-dc', '--decomposition', type=str, default='paths', choices=mfd_pc.DECOMPOSITIONS,
+                        help='Elements of the decomposition (pc solver only, default paths).')
+    parser.add_argument('-ws', '--warm-start', action='store_true',
+                        help='Warm start every size from the smallest decomposition known with more paths.')
+    parser.add_argument('-cp', '--compress', action='store_true',
+                        help='Contract chains of nodes before building the ILP (DAG solvers only).')
+    parser.add_argument('-ps', '--presolve', action='store_true',
+                        help='Tighten the flow intervals by flow conservation before building the ILP (inexact solver only).')
+    parser.add_argument('-sf', '--safety', action='store_true',
+                        help='Fix the variables of safe paths (DAG solvers only).')
+    parser.add_argument('-f', '--format', type=str, default='csv', choices=['csv', 'json'],
+                        help='Format of the results (default csv).')
+    parser.add_argument('-lb', '--label', type=str,
+                        help='Label of the results (default the git commit of the code).')
+
+    requiredNamed = parser.add_argument_group('required arguments')
+    requiredNamed.add_argument('-o', '--output', type=str, help='Output filename', required=True)
+
+    args = parser.parse_args()
+    if not backend_available(args.backend):
+        parser.error(f'the {args.backend} backend is not installed')
+    if args.linearization == 'indicator' and args.backend != 'gurobi':
+        parser.error('indicator constraints need the gurobi backend')
+
+    name = args.script or ('pc' if args.cycles > 0 and not args.input else 'standard')
+    script = SCRIPTS[name]
+    options = {'backend': args.backend, 'threads': args.threads, 'search_strategy': args.search, 'time_limit': args.time_limit,
+               'graph_time_limit': args.graph_time_limit, 'incremental': args.incremental,
+               'matrix': args.matrix, 'linearization': args.linearization, 'formulation': args.formulation, 'decomposition': args.decomposition, 'warm_start': args.warm_start, 'compress': args.compress, 'presolve': args.presolve, 'safety': args.safety}
+    for option, value in options.items():
+        if hasattr(script, option) or option == 'threads':
+            setattr(script, option, value)
+
+    label = args.label or code_version()
+    results = (run_graph(script, instance, raw_graph, width) for instance, raw_graph, width in instances(args))
+    with open(args.output, 'w+', newline='') as output:
+        if args.format == 'csv':
+            write_csv(output, label, name, args.backend, results)
+        else:
+            write_json(output, label, name, args.backend, options, results)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'MFD with Cycles'))
+import mfd_standard
+import mfd_inexact
+import mfd_pc
+from mfd_backend import BACKENDS, backend_available
+from mfd_generate import random_flows, format_graph
+
+## Solve times of the ILP backends on the example graphs of the repository and on
+## random flows. Every instance is solved with mfd_algorithm of the script for its
+## flow type (mfd_standard, mfd_inexact or mfd_pc) once per backend, and a line
+##   instance backend paths total build solve
+## is written per solve, with the times in seconds (build and solve summed over all
+## the sizes tried by the search).
+
+EXAMPLES = [
+    ('Version - 1.0/standalone/example.graph', mfd_standard),
+    ('Version - 1.0/standalone/example1.graph', mfd_standard),
+    ('Version - 1.0/standalone/example2.graph', mfd_standard),
+    ('Version - 1.0/standalone/example_inexact.graph', mfd_inexact),
+    ('../MFD with Cycles/Version 1.0/Example/Cycle/example.graph', mfd_pc),
+]
+
+
+def read_examples(filename):
+
+    # the examples start with comment lines, may hold several graphs separated by '#'
+    # lines and may name the nodes; the nodes are numbered in order of appearance
+    blocks = [list()]
+    with open(filename, 'r') as f:
+        for line in f:
+            if line.startswith('#'):
+                if blocks[-1]:
+                    blocks.append(list())
+            elif line.strip():
+                blocks[-1].append(line.split())
+
+    for lines in blocks:
+        if lines:
+            nodes = dict()
+            edges = [' '.join([str(nodes.setdefault(u, len(nodes))), str(nodes.setdefault(v, len(nodes)))] + flow) for u, v, *flow in lines[1:]]
+            yield '\n'.join(['graph', lines[0][0]] + edges) + '\n'
+
+
+def instances(seed, generated, nodes, paths):
+
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for filename, script in EXAMPLES:
+        name = os.path.basename(os.path.dirname(filename)) + '/' + os.path.basename(filename)
+        for g, raw_graph in enumerate(read_examples(os.path.join(folder, filename))):
+            yield f'{name}:{g}', script, raw_graph
+
+    for g, graph in enumerate(random_flows(seed, generated, nodes, paths, max_weight=20)):
+        yield f'random-{seed}-{g}', mfd_standard, format_graph(graph)
+
+
+def solve(script, raw_graph, backend, threads):
+
+    script.backend, script.threads = backend, threads
+    data = script.compute_graph_metadata(script.get_graph(raw_graph))
+
+    start = time.perf_counter()
+    data = script.mfd_algorithm(data)
+    total = time.perf_counter() - start
+
+    paths = len(data['solution']) if data['message'] == 'solved' else None
+    return paths, total, sum(t[1] for t in data['timings']), sum(t[2] for t in data['timings'])
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''
+        Compares the solve times of the ILP backends on the example graphs and on random flows.
+        ''',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument('-b', '--backends', type=str, nargs='+', default=BACKENDS, choices=BACKENDS,
+                        help='Backends to compare (default all the installed ones).')
+    parser.add_argument('-g', '--generated', type=int, default=20,
+                        help='Number of random flows (default 20).')
+    parser.add_argument('-n', '--nodes', type=int, default=30,
+                        help='Number of nodes of the random flows (default 30).')
+    parser.add_argument('-k', '--paths', type=int, default=8,
+                        help='Largest number of random paths summed into a random flow (default 8).')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='Seed of the random flows (default 0).')
+    parser.add_argument('-t', '--threads', type=int, default=1,
+                        help='Number of threads to use for each ILP solve (default 1).')
+    parser.add_argument('-o', '--output', type=str,
+                        help='Output filename (default standard output).')
+
+    args = parser.parse_args()
+
+    backends = [b for b in args.backends if backend_available(b)]
+    output = open(args.output, 'w+') if args.output else sys.stdout
+    output.write('instance backend paths total build solve\n')
+
+    totals = {backend: 0 for backend in backends}
+    for name, script, raw_graph in instances(args.seed, args.generated, args.nodes, args.paths):
+        for backend in backends:
+            paths, total, build, solve_time = solve(script, raw_graph, backend, args.threads)
+            totals[backend] += total
+            output.write(f'{name} {backend} {paths} {total:.4f} {build:.4f} {solve_time:.4f}\n')
+        output.flush()
+
+    for backend in backends:
+        print(f'INFO: {backend} {totals[backend]:.2f} s in total', file=sys.stderr)
+
+    if args.output:
+        output.close()
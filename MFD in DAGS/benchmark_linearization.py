@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import sys
+import time
+import argparse
+
+from mfd_backend import BACKENDS, backend_available
+from mfd_bounds import LINEARIZATIONS
+from benchmark_backends import instances
+
+## Solve times of the linearizations of the ILPs (see --linearization of the solvers)
+## on the example graphs of the repository and on random flows, the same instances as
+## benchmark_backends.py. Every instance is solved with mfd_algorithm of the script for
+## its flow type once per linearization, and a line
+##   instance linearization paths total build solve
+## is written per solve, with the times in seconds (build and solve summed over all
+## the sizes tried by the search). Indicator constraints are only compared with gurobi.
+
+def solve(script, raw_graph, backend, threads, linearization):
+
+    script.backend, script.threads, script.linearization = backend, threads, linearization
+    data = script.compute_graph_metadata(script.get_graph(raw_graph))
+
+    start = time.perf_counter()
+    data = script.mfd_algorithm(data)
+    total = time.perf_counter() - start
+
+    paths = len(data['solution']) if data['message'] == 'solved' else None
+    return paths, total, sum(t[1] for t in data['timings']), sum(t[2] for t in data['timings'])
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''
+        Compares the solve times of the linearizations of the ILPs on the example graphs and on random flows.
+        ''',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument('-lz', '--linearizations', type=str, nargs='+', default=LINEARIZATIONS, choices=LINEARIZATIONS,
+                        help='Linearizations to compare (default all, indicator only with gurobi).')
+    parser.add_argument('-b', '--backend', type=str, default='gurobi', choices=BACKENDS,
+                        help='ILP solver (default gurobi).')
+    parser.add_argument('-g', '--generated', type=int, default=20,
+                        help='Number of random flows (default 20).')
+    parser.add_argument('-n', '--nodes', type=int, default=30,
+                        help='Number of nodes of the random flows (default 30).')
+    parser.add_argument('-k', '--paths', type=int, default=8,
+                        help='Largest number of random paths summed into a random flow (default 8).')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='Seed of the random flows (default 0).')
+    parser.add_argument('-t', '--threads', type=int, default=1,
+                        help='Number of threads to use for each ILP solve (default 1).')
+    parser.add_argument('-o', '--output', type=str,
+                        help='Output filename (default standard output).')
+
+    args = parser.parse_args()
+    if not backend_available(args.backend):
+        parser.error(f'the {args.backend} backend is not installed')
+
+    linearizations = [l for l in args.linearizations if l != 'indicator' or args.backend == 'gurobi']
+    output = open(args.output, 'w+') if args.output else sys.stdout
+    output.write('instance linearization paths total build solve\n')
+
+    totals = {linearization: 0 for linearization in linearizations}
+    for name, script, raw_graph in instances(args.seed, args.generated, args.nodes, args.paths):
+        for linearization in linearizations:
+            paths, total, build, solve_time = solve(script, raw_graph, args.backend, args.threads, linearization)
+            totals[linearization] += total
+            output.write(f'{name} {linearization} {paths} {total:.4f} {build:.4f} {solve_time:.4f}\n')
+        output.flush()
+
+    for linearization in linearizations:
+        print(f'INFO: {linearization} {totals[linearization]:.2f} s in total', file=sys.stderr)
+
+    if args.output:
+        output.close()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import sys
+import argparse
+import mfd_subpath
+from mfd_backend import BACKENDS, backend_available
+from mfd_bounds import greedy_decomposition
+from mfd_search import SEARCH_STRATEGIES
+
+## Regression check of the search strategies of mfd_search.py on a subpath instance
+## whose greedy decomposition does not cover the subpaths, so that no feasible size is
+## known before the search. Its paths all have weight 1, so with the weights of at
+## least 1 of mfd_subpath.py no size above 4 is feasible: a search probing such a
+## size must not take it as a proof that fewer paths are infeasible. Every strategy
+## must find the same number of paths as the linear search; the script exits with
+## status 1 otherwise.
+
+GRAPH = '''#graph
+14
+0 2 1
+0 3 2
+0 4 1
+2 3 1
+3 4 1
+3 6 2
+4 5 1
+4 6 1
+5 13 1
+6 7 2
+6 9 1
+7 8 2
+8 13 2
+9 11 1
+11 13 1
+'''
+
+SUBPATHS = [[6, 7, 8], [0, 2, 3], [3, 6, 9], [0, 4, 5]]
+
+PATHS = 4
+
+
+def solve(strategy):
+
+    data = mfd_subpath.compute_graph_metadata(mfd_subpath.get_graph(GRAPH))
+    data['subpath'] = {'n': len(SUBPATHS), 'paths': [list(zip(path, path[1:])) for path in SUBPATHS]}
+    if greedy_decomposition(data) is not None:
+        sys.exit('ERROR: the greedy decomposition covers the subpaths, the instance checks nothing')
+
+    mfd_subpath.search_strategy = strategy
+    data = mfd_subpath.mfd_algorithm(data)
+    return data['message'], len(data['solution'])
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''
+        Checks that every search strategy finds the smallest number of paths on a subpath instance without a greedy upper bound.
+        ''',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument('-b', '--backend', type=str, default='gurobi', choices=BACKENDS,
+                        help='ILP solver (default gurobi).')
+
+    args = parser.parse_args()
+    if not backend_available(args.backend):
+        parser.error(f'the {args.backend} backend is not installed')
+
+    mfd_subpath.backend, mfd_subpath.threads = args.backend, 1
+    failed = False
+    for strategy in SEARCH_STRATEGIES:
+        message, paths = solve(strategy)
+        print(f'INFO: {strategy} {message} {paths} paths')
+        failed |= (message, paths) != ('solved', PATHS)
+
+    sys.exit(1 if failed else 0)
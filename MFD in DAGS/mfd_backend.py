@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import time
+import numpy as np
+
+try:
+    import gurobipy as gp
+    from gurobipy import GRB
+except ImportError:
+    gp = None
+
+try:
+    import highspy
+    from highspy.highs import highs_var, highs_cons, highs_linear_expression
+except ImportError:
+    highspy = None
+
+## Solver backends shared by the solvers in this folder and in 'MFD with Cycles'.
+## The scripts build their models with a subset of the gurobipy Model API (addVar,
+## addVars, addConstr on linear expressions, chgCoeff, remove, addMVar, addMConstr,
+## getAttr('X'), the Start, LB and UB attributes of the variables, status and
+## Runtime), and new_model returns a model implementing it:
+##   gurobi: a gurobipy Model
+##   highs:  a HighsModel (below) on top of the highspy modelling API
+## Statuses are reported with the GRB codes for both, and neither solver is required
+## unless its backend is used.
+
+BACKENDS = ['gurobi', 'highs']
+
+if gp is None:
+    class GRB:
+        BINARY, INTEGER, CONTINUOUS = 'B', 'I', 'C'
+        EQUAL, LESS_EQUAL, GREATER_EQUAL = '=', '<', '>'
+        INFINITY = 1e100
+        LOADED, OPTIMAL, INFEASIBLE, INF_OR_UNBD, UNBOUNDED = 1, 2, 3, 4, 5
+        TIME_LIMIT, INTERRUPTED, NUMERIC = 9, 11, 12
+        UNDEFINED = 1e101
+
+
+class BackendError(Exception):
+
+    def __init__(self, errno, message):
+        super().__init__(message)
+        self.errno = errno
+
+
+SOLVER_ERRORS = (BackendError, gp.GurobiError) if gp is not None else (BackendError,)
+
+
+def backend_available(backend):
+
+    return {'gurobi': gp, 'highs': highspy}.get(backend) is not None
+
+
+def new_model(name, backend='gurobi'):
+
+    if not backend_available(backend):
+        raise BackendError(-1, f'the {backend} backend is not installed')
+
+    return gp.Model(name) if backend == 'gurobi' else HighsModel(name)
+
+
+def empty_expression(model):
+
+    # a row with no variables yet, they are added with chgCoeff
+    return highs_linear_expression() if isinstance(model, HighsModel) else gp.LinExpr()
+
+
+if highspy is not None:
+
+    class HighsVar(highs_var):
+
+        # the bounds and the start value are kept with the variable, so that they
+        # do not depend on its column index
+        __slots__ = ['model', 'lb', 'ub', 'start']
+
+        def __init__(self, index, model, lb, ub):
+            super().__init__(index, model.highs)
+            self.model, self.lb, self.ub, self.start = model, lb, ub, None
+
+        @property
+        def LB(self):
+            return self.lb
+
+        @LB.setter
+        def LB(self, value):
+            self.lb = value
+            self.model.highs.changeColBounds(self.index, self.lb, self.ub)
+
+        @property
+        def UB(self):
+            return self.ub
+
+        @UB.setter
+        def UB(self, value):
+            self.ub = value
+            self.model.highs.changeColBounds(self.index, self.lb, self.ub)
+
+        @property
+        def Start(self):
+            return self.start
+
+        @Start.setter
+        def Start(self, value):
+            # GRB.UNDEFINED leaves the variable out of a partial start
+            self.start = None if value == GRB.UNDEFINED else value
+
+        @property
+        def X(self):
+            return self.model.getAttr('X', [self])[0]
+
+    HIGHS_STATUS = {
+        highspy.HighsModelStatus.kOptimal: GRB.OPTIMAL,
+        highspy.HighsModelStatus.kInfeasible: GRB.INFEASIBLE,
+        highspy.HighsModelStatus.kUnboundedOrInfeasible: GRB.INF_OR_UNBD,
+        highspy.HighsModelStatus.kUnbounded: GRB.UNBOUNDED,
+        highspy.HighsModelStatus.kTimeLimit: GRB.TIME_LIMIT,
+        highspy.HighsModelStatus.kInterrupt: GRB.INTERRUPTED,
+        # the other limits stop the solve without a result, like an interrupt
+        highspy.HighsModelStatus.kHighsInterrupt: GRB.INTERRUPTED,
+        highspy.HighsModelStatus.kIterationLimit: GRB.INTERRUPTED,
+        highspy.HighsModelStatus.kSolutionLimit: GRB.INTERRUPTED,
+        highspy.HighsModelStatus.kObjectiveBound: GRB.INTERRUPTED,
+        highspy.HighsModelStatus.kObjectiveTarget: GRB.INTERRUPTED,
+        highspy.HighsModelStatus.kMemoryLimit: GRB.INTERRUPTED,
+    }
+
+    HIGHS_PARAMS = {
+        'OutputFlag': ('output_flag', bool),
+        'LogToConsole': ('log_to_console', bool),
+        'Threads': ('threads', int),
+        'TimeLimit': ('time_limit', float),
+    }
+
+    HIGHS_TYPES = {
+        GRB.BINARY: highspy.HighsVarType.kInteger,
+        GRB.INTEGER: highspy.HighsVarType.kInteger,
+        GRB.CONTINUOUS: highspy.HighsVarType.kContinuous,
+    }
+
+
+class HighsModel:
+
+    def __init__(self, name):
+
+        self.name = name
+        self.highs = highspy.Highs()
+        self.columns, self.rows = list(), list()
+        self.status = GRB.LOADED
+        self.Runtime = 0
+
+    def setParam(self, param, value):
+
+        if param not in HIGHS_PARAMS:
+            raise BackendError(10007, f'Unknown parameter: {param}')
+        option, cast = HIGHS_PARAMS[param]
+        self.highs.setOptionValue(option, cast(value))
+
+    def add_columns(self, n, vtype, names, lb, ub):
+
+        lb = 0 if lb is None else lb
+        ub = (1 if vtype == GRB.BINARY else highspy.kHighsInf) if ub is None else ub
+        first = len(self.columns)
+        self.highs.addCols(n, np.zeros(n), np.full(n, lb, dtype=float), np.full(n, ub, dtype=float), 0, np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0))
+        indices = np.arange(first, first + n, dtype=np.int32)
+        if vtype != GRB.CONTINUOUS:
+            self.highs.changeColsIntegrality(n, indices, np.full(n, HIGHS_TYPES[vtype], dtype=np.uint8))
+        for j, name in zip(indices, names):
+            self.highs.passColName(int(j), name)
+
+        columns = [HighsVar(int(j), self, lb, ub) for j in indices]
+        self.columns += columns
+        return columns
+
+    def addVar(self, lb=0, ub=None, obj=0, vtype=GRB.CONTINUOUS, name=''):
+
+        return self.add_columns(1, vtype, [name or f'C{len(self.columns)}'], lb, ub)[0]
+
+    def addVars(self, keys, lb=0, ub=None, obj=0, vtype=GRB.CONTINUOUS, name='C'):
+
+        keys = list(keys)
+        names = [f"{name}[{','.join(map(str, key))}]" for key in keys]
+        return dict(zip(keys, self.add_columns(len(keys), vtype, names, lb, ub)))
+
+    def addMVar(self, shape, lb=0, ub=None, obj=0, vtype=GRB.CONTINUOUS, name=''):
+
+        names = name if not isinstance(name, str) else [f'{name}[{j}]' for j in range(shape)]
+        columns = np.empty(shape, dtype=object)
+        columns[:] = self.add_columns(shape, vtype, names, lb, ub)
+        return columns
+
+    def addConstr(self, constr, name=''):
+
+        row = self.highs.addConstr(constr)
+        self.rows.append(row)
+        return row
+
+    def addMConstr(self, A, x, sense, b, name=''):
+
+        # the columns of A are the variables in x, in the same order
+        A = A.tocsr()
+        m = A.shape[0]
+        columns = np.array([v.index for v in x], dtype=np.int32)
+        sense, b = np.broadcast_to(sense, m), np.broadcast_to(b, m).astype(float)
+        lower = np.where(sense == GRB.LESS_EQUAL, -highspy.kHighsInf, b)
+        upper = np.where(sense == GRB.GREATER_EQUAL, highspy.kHighsInf, b)
+
+        first = len(self.rows)
+        self.highs.addRows(m, lower, upper, A.nnz, A.indptr[:-1].astype(np.int32), columns[A.indices], A.data.astype(float))
+        rows = [highs_cons(first + n, self.highs) for n in range(m)]
+        self.rows += rows
+        return rows
+
+    def chgCoeff(self, constr, var, value):
+
+        self.highs.changeCoeff(constr.index, var.index, value)
+
+    def remove(self, items):
+
+        # lists (path_constrs, or the rows of an addMConstr) are removed element by element
+        def flatten(items):
+            if isinstance(items, (list, tuple, np.ndarray)):
+                for item in items:
+                    yield from flatten(item)
+            elif isinstance(items, dict):
+                yield from flatten(list(items.values()))
+            else:
+                yield items
+
+        removed = list(flatten(items))
+        columns = {id(v) for v in removed if isinstance(v, highs_var)}
+        rows = {id(c) for c in removed if isinstance(c, highs_cons)}
+        if columns:
+            indices = np.array([v.index for v in self.columns if id(v) in columns], dtype=np.int32)
+            self.highs.deleteCols(len(indices), indices)
+            self.columns = [v for v in self.columns if id(v) not in columns]
+            for j, v in enumerate(self.columns):
+                v.index = j
+        if rows:
+            indices = np.array([c.index for c in self.rows if id(c) in rows], dtype=np.int32)
+            self.highs.deleteRows(len(indices), indices)
+            self.rows = [c for c in self.rows if id(c) not in rows]
+            for n, c in enumerate(self.rows):
+                c.index = n
+
+    def update(self):
+
+        pass
+
+    def optimize(self):
+
+        start = [v for v in self.columns if v.start is not None]
+        if start:
+            self.highs.setSolution(len(start), np.array([v.index for v in start], dtype=np.int32), np.array([v.start for v in start], dtype=float))
+
+        begin = time.perf_counter()
+        self.highs.run()
+        self.Runtime = time.perf_counter() - begin
+        # errors, and any status not mapped above, prove nothing about the model (see mfd_search.py)
+        self.status = HIGHS_STATUS.get(self.highs.getModelStatus(), GRB.NUMERIC)
+
+    def getAttr(self, attr, objs):
+
+        if attr != 'X':
+            raise BackendError(10003, f'Unknown attribute: {attr}')
+        if self.status != GRB.OPTIMAL:
+            raise BackendError(10005, 'Unable to retrieve attribute X')
+
+        values = self.highs.getSolution().col_value
+        if isinstance(objs, dict):
+            return {key: values[v.index] for key, v in objs.items()}
+        return [values[v.index] for v in objs]
+
+    def write(self, filename):
+
+        self.highs.writeModel(filename)
+
+    def dispose(self):
+
+        self.highs = None
+        self.columns, self.rows = list(), list()
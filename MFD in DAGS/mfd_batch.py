@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import multiprocessing
+from collections import deque
+
+## Batch driver shared by the solvers in this folder and in 'MFD with Cycles':
+## the '#'-separated blocks of the input files are read one at a time, solve_graph
+## is applied to every task (the arguments of one graph) and the results are
+## yielded in input order, each one as soon as it and all the graphs before it
+## are solved.
+
+def read_blocks(filename):
+
+    # same blocks as open(filename).read().split('#')[1:] for files where '#' only
+    # starts a line, without holding more than one block in memory
+    with open(filename, 'r') as f:
+        block = None
+        for line in f:
+            if line.startswith('#'):
+                if block is not None:
+                    yield ''.join(block)
+                block = [line[1:]]
+            elif block is not None:
+                block.append(line)
+
+    if block is not None:
+        yield ''.join(block)
+
+def map_graphs(solve_graph, tasks, jobs=1, initializer=None, initargs=()):
+
+    if jobs == 0:
+        jobs = os.cpu_count()
+
+    if jobs == 1:
+        for task in tasks:
+            yield solve_graph(*task)
+        return
+
+    # at most 2 * jobs graphs are in flight, so the input can be a generator
+    with multiprocessing.Pool(jobs, initializer, initargs) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(solve_graph, task))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
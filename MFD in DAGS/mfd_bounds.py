@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import math
+import networkx as nx
+from heapq import heappush, heappop
+
+## Lower and upper bounds on the number of paths of a flow decomposition, shared by
+## the solvers in this folder and in 'MFD with Cycles'. Only edges with non-zero
+## flow (or, for inexact flows, non-zero lower flow) need to be covered by a path.
+## Also the bounds on the flow of every edge and on the weight of every path that the
+## linearization of the ILPs uses as big-M values.
+
+LINEARIZATIONS = ['global', 'edge', 'indicator']
+
+
+def required_edges(data):
+
+    graph = data['graph']
+    edges = graph.edges(keys=True) if graph.is_multigraph() else graph.edges()
+    if 'lower flow' in data:
+        lower = data['lower flow']
+        return [e for e in edges if lower[e[0], e[1]] > 0]
+
+    return [e for e in edges if graph.edges[e]['flow'] > 0]
+
+
+def lower_bound_degree(required, repeated=()):
+
+    # every path (or cycle) leaves and enters each node at most once; a trail or a walk
+    # of mfd_pc.py only the nodes not on a cycle (not in repeated)
+    out_degree, in_degree = dict(), dict()
+    for e in required:
+        if e[0] not in repeated:
+            out_degree[e[0]] = out_degree.get(e[0], 0) + 1
+        if e[1] not in repeated:
+            in_degree[e[1]] = in_degree.get(e[1], 0) + 1
+
+    return max([1] + list(out_degree.values()) + list(in_degree.values()))
+
+
+def lower_bound_distinct_flow_values(graph, required):
+
+    # the flow of every edge is the sum of a non-empty subset of the k path weights,
+    # so there are at most 2^k - 1 distinct non-zero flow values
+    flow_values = set(graph.edges[e]['flow'] for e in required)
+    return max(1, math.ceil(math.log2(len(flow_values) + 1)))
+
+
+def lower_bound_width(graph, sources, sinks, required):
+
+    # minimum number of source-to-sink paths covering every required edge, i.e. the
+    # minimum flow with lower bound 1 on the required edges; the lower bounds are moved
+    # into node demands and the circulation through the sink-to-source edge is minimized
+    source, sink = ('source',), ('sink',)
+    cover = nx.DiGraph()
+    cover.add_nodes_from(graph.nodes, demand=0)
+    cover.add_nodes_from([source, sink], demand=0)
+    cover.add_edges_from(graph.edges())
+    cover.add_edges_from((source, v) for v in sources)
+    cover.add_edges_from((v, sink) for v in sinks)
+    cover.add_edge(sink, source, weight=1)
+
+    for e in required:
+        cover.nodes[e[0]]['demand'] += 1
+        cover.nodes[e[1]]['demand'] -= 1
+
+    width, _ = nx.network_simplex(cover)
+    return max(1, width)
+
+
+def compute_lower_bounds(data, decomposition='paths'):
+
+    # the trails and walks of mfd_pc.py may go through the nodes of its cycles several
+    # times, and a walk may use an edge several times, so that the flow of the edge is
+    # no longer a sum of distinct weights
+    graph = data['graph']
+    required = required_edges(data)
+
+    bounds = {'degree': lower_bound_degree(required, data['cycle nodes'] if decomposition != 'paths' else ())}
+    if 'lower flow' not in data and decomposition != 'walks':
+        bounds['distinct_flow_values'] = lower_bound_distinct_flow_values(graph, required)
+    if nx.is_directed_acyclic_graph(graph):
+        bounds['width'] = lower_bound_width(graph, data['sources'], data['sinks'], required)
+
+    return bounds
+
+
+def lower_bound(data, decomposition='paths'):
+
+    # the largest bound, and the name of the bound attaining it
+    bounds = compute_lower_bounds(data, decomposition)
+    name = max(bounds, key=bounds.get)
+    data['lower_bounds'] = bounds
+    data['lower_bound'] = bounds[name], name
+
+    return bounds[name]
+
+
+def largest_size(data, cycles=False):
+
+    # the most paths with weights of at least 1 that the flow can carry: every path leaves
+    # a source through one edge (and every cycle of mfd_pc uses some edge)
+    graph = data['graph']
+    edges = graph.edges(keys=True, data='flow') if graph.is_multigraph() else graph.edges(data='flow')
+    return max(1, int(sum(e[-1] for e in edges if cycles or e[0] in data['sources'])))
+
+
+def widest_path(graph, residual, sources, sinks):
+
+    # modified Dijkstra maximizing the smallest residual flow along a source-to-sink path
+    width, pred, done = dict(), dict(), set()
+    heap = [(-math.inf, n, v) for n, v in enumerate(sources)]
+    counter = len(heap)
+
+    while heap:
+        negative_width, _, u = heappop(heap)
+        if u in done:
+            continue
+        done.add(u)
+
+        if u in sinks and u in pred:
+            path = [pred[u]]
+            while path[-1][0] in pred:
+                path.append(pred[path[-1][0]])
+            return -negative_width, path[::-1]
+
+        for e in (graph.out_edges(u, keys=True) if graph.is_multigraph() else graph.out_edges(u)):
+            c = min(-negative_width, residual[e])
+            if c > 0 and e[1] not in done and c > width.get(e[1], 0):
+                width[e[1]], pred[e[1]] = c, e
+                heappush(heap, (-c, counter, e[1]))
+                counter += 1
+
+    return 0, []
+
+
+def residual_cycle(graph, residual):
+
+    # follow edges with positive residual flow until a node repeats
+    start = next((e for e, f in residual.items() if f > 0), None)
+    walk, position = [start], {start[0]: 0}
+    while walk[-1][1] not in position:
+        position[walk[-1][1]] = len(walk)
+        e = next((e for e in (graph.out_edges(walk[-1][1], keys=True) if graph.is_multigraph() else graph.out_edges(walk[-1][1])) if residual[e] > 0), None)
+        if e is None:
+            return None
+        walk.append(e)
+
+    return walk[position[walk[-1][1]]:]
+
+
+def greedy_decomposition(data, cycles=False):
+
+    # greedy-width heuristic: repeatedly take the widest source-to-sink path and subtract it,
+    # then split what is left into cycles; the decomposition is returned only when it is
+    # valid for the ILP of the calling solver (integral weights, subpaths covered). Every
+    # path of the DAG solvers leaves every source and enters every sink, so without the
+    # cycles of mfd_pc the graph must have one source and one sink (and is then connected)
+    graph = data['graph']
+    if not cycles and (len(data['sources']) != 1 or len(data['sinks']) != 1):
+        return None
+    edges = graph.edges(keys=True) if graph.is_multigraph() else graph.edges()
+    residual = {e: graph.edges[e]['flow'] for e in edges}
+    if any(f < 0 or f != int(f) for f in residual.values()):
+        return None
+
+    weights, paths = list(), list()
+    while True:
+        width, path = widest_path(graph, residual, data['sources'], set(data['sinks']))
+        if width == 0:
+            break
+        for e in path:
+            residual[e] -= width
+        weights.append(int(width))
+        paths.append(path)
+
+    while any(f > 0 for f in residual.values()):
+        cycle = residual_cycle(graph, residual)
+        if cycle is None:
+            return None
+        width = min(residual[e] for e in cycle)
+        for e in cycle:
+            residual[e] -= width
+        weights.append(int(width))
+        paths.append(cycle)
+
+    if 'subpath' in data:
+        covered = [set((e[0], e[1]) for e in path) for path in paths]
+        if not all(any(set(subpath) <= path_edges for path_edges in covered) for subpath in data['subpath']['paths']):
+            return None
+
+    return weights, paths
+
+
+def flow_bounds(data, linearization='edge', cycles=False):
+
+    # big-M values of the linearization z = w x of every path: an upper bound on the flow
+    # of every edge (its flow, or its upper flow for inexact flows) and on the weight of a
+    # path, which leaves a source and enters a sink through one edge each (a cycle of
+    # mfd_pc may avoid both, so its weight is only bounded by the largest edge); with
+    # 'global' linearization both are the largest flow value, as in the original model
+    graph = data['graph']
+    edges = list(graph.edges(keys=True)) if graph.is_multigraph() else list(graph.edges())
+    if linearization == 'global':
+        return {e: data['max_flow_value'] for e in edges}, data['max_flow_value']
+
+    upper = data.get('upper flow')
+    bounds = {e: upper[e[0], e[1]] if upper is not None else graph.edges[e]['flow'] for e in edges}
+    if cycles:
+        return bounds, max(bounds.values())
+
+    out_sources = [bounds[e] for e in edges if e[0] in data['sources']]
+    in_sinks = [bounds[e] for e in edges if e[1] in data['sinks']]
+    return bounds, min(max(out_sources), max(in_sinks))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import json
+import hashlib
+
+## On-disk cache of solved graphs, shared by the solvers in this folder and in
+## 'MFD with Cycles', so that a graph seen in an earlier run (or earlier in the same
+## run) skips the ILP. The key is a hash of the variant and of the sorted edge list
+## with the flows (and the sorted subpaths), so it does not depend on the order of
+## the input lines. Every entry is a JSON file in the cache folder holding the
+## decomposition, its number of paths and the proved lower bound; only decompositions
+## proved minimum ('solved') are stored. When the folder holds more than `size`
+## entries, the least recently used ones are removed.
+
+CACHE_VERSION = 1
+
+
+def graph_key(variant, edges, subpaths=()):
+
+    canonical = {
+        'version': CACHE_VERSION,
+        'variant': variant,
+        'edges': sorted(list(e) for e in edges),
+        'subpaths': sorted([list(e) for e in path] for path in subpaths),
+    }
+    return hashlib.sha256(json.dumps(canonical).encode()).hexdigest()
+
+
+def cache_file(folder, key):
+
+    return os.path.join(folder, f'{key}.json')
+
+
+def load_result(folder, key, data):
+
+    filename = cache_file(folder, key)
+    try:
+        with open(filename, 'r') as f:
+            entry = json.load(f)
+        # a hit makes the entry the most recently used one
+        os.utime(filename)
+    except (OSError, ValueError):
+        return False
+
+    lower = entry['lower']
+    data['solution'] = [[tuple(e) for e in path] for path in entry['paths']]
+    data['weights'] = entry['weights']
+    data['message'] = entry['status']
+    data['lower_bound'] = tuple(entry['lower_bound'])
+    data['search'] = {'strategy': 'cache', 'infeasible': lower - 1, 'timeout': lower - 1, 'feasible': entry['size'], 'best': None, 'sizes': dict()}
+    data['runtime'] = 0
+    data['timings'] = list()
+    data['cache'] = 'hit'
+
+    return True
+
+
+def store_result(folder, key, data, size):
+
+    data['cache'] = 'miss'
+    if data['message'] != 'solved':
+        return
+
+    entry = {
+        'paths': data['solution'],
+        'weights': data['weights'],
+        'size': len(data['solution']),
+        'status': data['message'],
+        'lower': data['search']['infeasible'] + 1,
+        'lower_bound': data['lower_bound'],
+    }
+
+    # written to a file of this process first, so that other processes never read half an entry
+    os.makedirs(folder, exist_ok=True)
+    filename = cache_file(folder, key)
+    partial = f'{filename}.{os.getpid()}'
+    with open(partial, 'w') as f:
+        json.dump(entry, f)
+    os.replace(partial, filename)
+
+    evict(folder, size)
+
+
+def evict(folder, size):
+
+    entries = [os.path.join(folder, name) for name in os.listdir(folder) if name.endswith('.json')]
+    if len(entries) <= size:
+        return
+
+    def last_used(filename):
+        try:
+            return os.path.getmtime(filename)
+        except OSError:
+            return 0
+
+    for filename in sorted(entries, key=last_used)[:len(entries) - size]:
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from collections import deque
+from mfd_batch import map_graphs
+
+## Splitting of the input graphs into weakly connected components, shared by the
+## solvers in this folder and in 'MFD with Cycles'. No path (or cycle) can use edges
+## of two components, so a minimum decomposition of a graph is the union of minimum
+## decompositions of its components, and each component is solved as a graph of its
+## own: map_components passes the components of all the graphs to map_graphs (so
+## they are solved in parallel with --jobs) and merges their results back into one
+## result per graph, in the order of the graphs.
+##
+## The edges of a component keep their input order, so a graph with one component
+## is solved exactly as without the split.
+
+# lists of the graphs with one entry per edge
+EDGE_LISTS = ['edges', 'lower flow', 'upper flow']
+
+
+def edge_components(edges):
+
+    # union-find over the endpoints, components numbered in order of their first edge
+    parent = dict()
+
+    def find(v):
+        parent.setdefault(v, v)
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for u, v, *_ in edges:
+        parent[find(u)] = find(v)
+
+    numbers, components = dict(), list()
+    for u, v, *_ in edges:
+        components.append(numbers.setdefault(find(u), len(numbers)))
+
+    return components, {v: numbers[find(v)] for v in parent}
+
+
+def split_graph(graph, subpath=None):
+
+    components, node_component = edge_components(graph['edges'])
+    count = max(components, default=0) + 1
+    if count == 1:
+        return [(graph,) if subpath is None else (graph, subpath)]
+
+    parts = [{key: [value[j] for j, c in enumerate(components) if c == part] for key, value in graph.items() if key in EDGE_LISTS}
+             for part in range(count)]
+    for part in parts:
+        part['n'] = len({v for e in part['edges'] for v in e[:2]})
+
+    if subpath is None:
+        return [(part,) for part in parts]
+
+    # a subpath belongs to the component of its first edge (empty ones to the first component)
+    paths = [list() for _ in range(count)]
+    for path in subpath['paths']:
+        paths[node_component[path[0][0]] if path else 0].append(path)
+
+    return [(part, {'n': len(paths[c]), 'paths': paths[c]}) for c, part in enumerate(parts)]
+
+
+def split_tasks(tasks, counts):
+
+    # the number of components of every graph is appended to counts before its first component is yielded
+    for task in tasks:
+        parts = split_graph(*task)
+        counts.append(len(parts))
+        yield from parts
+
+
+def map_components(solve_graph, tasks, jobs=1, initializer=None, initargs=()):
+
+    counts = deque()
+    results = map_graphs(solve_graph, split_tasks(tasks, counts), jobs, initializer, initargs)
+    for first in results:
+        parts = [first] + [next(results) for _ in range(counts.popleft() - 1)]
+        yield merge_decompositions(parts)
+
+
+def merge_decompositions(parts):
+
+    parts = [part for part in parts if part is not None]
+    if len(parts) <= 1:
+        return parts[0] if parts else None
+
+    messages = [part['message'] for part in parts]
+    searches = [part['search'] for part in parts]
+    names = {part['lower_bound'][1] for part in parts}
+
+    data = {
+        'components': len(parts),
+        'runtime': sum(part['runtime'] for part in parts),
+        'message': 'solved' if all(m == 'solved' for m in messages) else 'timeout' if 'timeout' in messages else 'unsolved',
+        'lower_bound': (sum(part['lower_bound'][0] for part in parts), names.pop() if len(names) == 1 else 'components'),
+        'search': {
+            'strategy': searches[0]['strategy'],
+            'infeasible': sum(search['infeasible'] + 1 for search in searches) - 1,
+            'feasible': None if any(search['feasible'] is None for search in searches) else sum(search['feasible'] for search in searches),
+            'sizes': dict(),
+        },
+        'timings': [timing for part in parts for timing in part['timings']],
+    }
+
+    # a decomposition of the graph needs one of every component
+    if all(part['solution'] for part in parts):
+        data['weights'] = [weight for part in parts for weight in part['weights']]
+        data['solution'] = [path for part in parts for path in part['solution']]
+    else:
+        data['weights'], data['solution'] = list(), list()
+
+    if all('cache' in part for part in parts):
+        data['cache'] = 'hit' if all(part['cache'] == 'hit' for part in parts) else 'miss'
+    if all('compression' in part for part in parts):
+        data['compression'] = tuple(sum(part['compression'][j] for part in parts) for j in range(2))
+    if all('pruning' in part for part in parts):
+        data['pruning'] = tuple(sum(part['pruning'][j] for part in parts) for j in range(2))
+    if all('presolve' in part for part in parts):
+        data['presolve'] = {key: sum(part['presolve'][key] for part in parts) for key in parts[0]['presolve']}
+    if all('safety' in part for part in parts):
+        data['safety'] = {key: sum(part['safety'][key] for part in parts) for key in parts[0]['safety']}
+    if all('cuts' in part for part in parts):
+        data['cuts'] = sum(part['cuts'] for part in parts)
+    if all('lazy' in part for part in parts):
+        data['lazy'] = {key: sum(part['lazy'][key] for part in parts) for key in parts[0]['lazy']}
+
+    return data
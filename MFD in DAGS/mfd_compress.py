@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+## Graph compression shared by the solvers in this folder: chains of nodes with
+## in-degree 1 and out-degree 1 carry no decision, so each chain is contracted
+## into a single edge before the ILP is built, and the paths of the solution are
+## expanded back to the original edges afterwards.
+##
+## A chain is not contracted when it would create a parallel edge (or a self-loop):
+## merging two edges is not lossless, since the paths through the merged edge would
+## also have to split into subsets matching the flow of each original edge, and the
+## subpath constraints address the edges by their endpoints.
+
+def contract_node(data, v):
+
+    graph = data['graph']
+    (u, _, k1), (_, w, k2) = list(graph.in_edges(v, keys=True))[0], list(graph.out_edges(v, keys=True))[0]
+    if u == w or graph.has_edge(u, w):
+        return False
+
+    if 'lower flow' in data:
+        # the same paths go through both edges, so both intervals apply to the contracted edge
+        lower, upper = data['lower flow'], data['upper flow']
+        lower[u, w], upper[u, w] = max(lower[u, v], lower[v, w]), min(upper[u, v], upper[v, w])
+        flow = (lower[u, w] + upper[u, w]) / 2
+    elif graph.edges[u, v, k1]['flow'] == graph.edges[v, w, k2]['flow']:
+        flow = graph.edges[u, v, k1]['flow']
+    else:
+        return False
+
+    expansion = data['expansion']
+    expansion[u, w, 0] = expansion.pop((u, v, k1), [(u, v, k1)]) + expansion.pop((v, w, k2), [(v, w, k2)])
+    graph.remove_node(v)
+    graph.add_edge(u, w, key=0, flow=flow)
+
+    return True
+
+
+def compress_graph(data):
+
+    graph = data['graph']
+    data['expansion'] = dict()
+    edges = len(graph.edges)
+
+    for v in list(graph.nodes):
+        if graph.in_degree(v) == 1 and graph.out_degree(v) == 1:
+            contract_node(data, v)
+
+    if 'subpath' in data:
+        data['subpath'] = compress_subpaths(data['subpath'], data['expansion'])
+
+    data['compression'] = (edges, len(graph.edges))
+    return data
+
+
+def compress_subpaths(subpath, expansion):
+
+    # every original edge of a subpath is replaced by the edge it was contracted into
+    contracted = {(e[0], e[1]): (c[0], c[1]) for c, original in expansion.items() for e in original}
+    paths = list()
+    for path in subpath['paths']:
+        edges = list()
+        for e in path:
+            e = contracted.get(e, e)
+            if not edges or edges[-1] != e:
+                edges.append(e)
+        paths.append(edges)
+
+    return dict(subpath, paths=paths)
+
+
+def expand_paths(data, paths):
+
+    expansion = data.get('expansion', dict())
+    return [sorted(e for c in path for e in expansion.get(c, [c])) for path in paths]
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import random
+import argparse
+
+## Reproducible random flows, used by the benchmarks and for testing the solvers in
+## this folder and in 'MFD with Cycles'. A flow is the overlay of k weighted paths
+## from node 0 to node n - 1 through increasing inner nodes (so the graph is a DAG
+## and k is an upper bound on the size of its minimum decomposition), plus, for the
+## cyclic variant, weighted cycles through random inner nodes. The paths have at most
+## `length` inner nodes and their weights follow one of WEIGHT_DISTRIBUTIONS, capped
+## at max_weight.
+
+WEIGHT_DISTRIBUTIONS = ['uniform', 'exponential', 'zipf']
+
+
+def random_weight(rng, distribution, max_weight):
+
+    if distribution == 'exponential':
+        weight = 1 + int(rng.expovariate(4 / max_weight))
+    elif distribution == 'zipf':
+        weight = int(rng.paretovariate(1))
+    else:
+        weight = rng.randint(1, max_weight)
+
+    return min(weight, max_weight)
+
+
+def overlay(flow, nodes, weight, closed=False):
+
+    for u, v in zip(nodes, nodes[1:] + nodes[:1] if closed else nodes[1:]):
+        flow[u, v] = flow.get((u, v), 0) + weight
+
+
+def random_flow(rng, n, k, length=6, distribution='uniform', max_weight=100, cycles=0):
+
+    flow, paths = dict(), list()
+    for _ in range(k):
+        weight = random_weight(rng, distribution, max_weight)
+        path = [0] + sorted(rng.sample(range(1, n - 1), rng.randint(1, min(length, n - 2)))) + [n - 1]
+        overlay(flow, path, weight)
+        paths.append((weight, path))
+
+    # cycles visit at least 2 inner nodes in random order, so they may close cycles of any length
+    for _ in range(cycles if n > 3 else 0):
+        weight = random_weight(rng, distribution, max_weight)
+        cycle = rng.sample(range(1, n - 1), rng.randint(2, max(2, min(length, n - 2))))
+        overlay(flow, cycle, weight, closed=True)
+        paths.append((weight, cycle + cycle[:1]))
+
+    return {'n': n, 'edges': [(u, v, f) for (u, v), f in sorted(flow.items())], 'paths': paths}
+
+
+def format_graph(graph, name='graph'):
+
+    # one block of the input format of the scripts
+    lines = [f'#{name}', str(graph['n'])] + [f'{u} {v} {f}' for u, v, f in graph['edges']]
+    return '\n'.join(lines) + '\n'
+
+
+def random_flows(seed, graphs, n, k, length=6, distribution='uniform', max_weight=100, cycles=0):
+
+    # the number of paths of every flow is drawn from 1..k, so one seed fixes the whole set
+    rng = random.Random(seed)
+    for _ in range(graphs):
+        yield random_flow(rng, n, rng.randint(1, k), length, distribution, max_weight, cycles)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''
+        Writes random flows, overlays of weighted paths (and cycles), in the input format of the solvers.
+        ''',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument('-g', '--graphs', type=int, default=10,
+                        help='Number of flows (default 10).')
+    parser.add_argument('-n', '--nodes', type=int, default=50,
+                        help='Number of nodes of every flow (default 50).')
+    parser.add_argument('-k', '--paths', type=int, default=8,
+                        help='Largest number of paths overlaid into a flow, the width of the flow is at most this (default 8).')
+    parser.add_argument('-l', '--length', type=int, default=6,
+                        help='Largest number of inner nodes of a path or cycle (default 6).')
+    parser.add_argument('-c', '--cycles', type=int, default=0,
+                        help='Number of cycles overlaid into every flow, for mfd_pc.py (default 0).')
+    parser.add_argument('-wd', '--weights', type=str, default='uniform', choices=WEIGHT_DISTRIBUTIONS,
+                        help='Distribution of the path weights (default uniform):\n   uniform (1 to the maximum weight),\n   exponential (mean a quarter of the maximum weight),\n   zipf (Pareto with exponent 1, mostly small weights).')
+    parser.add_argument('-mw', '--max-weight', type=int, default=100,
+                        help='Largest path weight (default 100).')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='Seed of the random flows (default 0).')
+
+    requiredNamed = parser.add_argument_group('required arguments')
+    requiredNamed.add_argument('-o', '--output', type=str, help='Output filename', required=True)
+
+    args = parser.parse_args()
+
+    with open(args.output, 'w+') as output:
+        for g, graph in enumerate(random_flows(args.seed, args.graphs, args.nodes, args.paths, args.length, args.weights, args.max_weight, args.cycles)):
+            output.write(format_graph(graph, f'graph {g}'))
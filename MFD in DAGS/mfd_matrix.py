@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+import scipy.sparse as sp
+
+## The constraints of one path as sparse matrices, shared by the solvers in this
+## folder and in 'MFD with Cycles'. A block (matrix, senses, right-hand sides) only
+## depends on the graph, so it is built once per graph, and every path is added with
+## one addMConstr per block over the variables of that path, instead of one addConstr
+## per row. The rows and their coefficients are the same, and in the same order, as
+## the ones built one at a time by add_path, so both builders give the same model.
+
+def graph_edges(graph):
+
+    return list(graph.edges(keys=True)) if graph.is_multigraph() else list(graph.edges())
+
+
+def incident_edges(graph, v, out):
+
+    edges = graph.out_edges if out else graph.in_edges
+    return edges(v, keys=True) if graph.is_multigraph() else edges(v)
+
+
+def sparse_block(rows, columns, sense, rhs):
+
+    # every row is a list of (column, coefficient); repeated columns are summed and
+    # cancelling ones dropped, like in a LinExpr
+    row = [n for n, entries in enumerate(rows) for _ in entries]
+    column = [j for entries in rows for j, _ in entries]
+    value = [a for entries in rows for _, a in entries]
+    matrix = sp.csr_matrix((value, (row, column)), shape=(len(rows), columns))
+    matrix.sum_duplicates()
+    matrix.eliminate_zeros()
+
+    return matrix, np.array(sense), np.array(rhs, dtype=float)
+
+
+def conservation_block(graph, sources, sinks, endpoint_sense='='):
+
+    # over the x variables of a path, in the order of graph_edges
+    index = {e: j for j, e in enumerate(graph_edges(graph))}
+    rows, sense, rhs = list(), list(), list()
+    for v in graph.nodes:
+        out_edges = [(index[e], 1) for e in incident_edges(graph, v, True)]
+        in_edges = [(index[e], 1) for e in incident_edges(graph, v, False)]
+        if v in sources:
+            rows.append(out_edges)
+            sense.append(endpoint_sense)
+            rhs.append(1)
+        if v in sinks:
+            rows.append(in_edges)
+            sense.append(endpoint_sense)
+            rhs.append(1)
+        if v not in sources and v not in sinks:
+            rows.append(out_edges + [(j, -1) for j, _ in in_edges])
+            sense.append('=')
+            rhs.append(0)
+
+    return sparse_block(rows, len(index), sense, rhs)
+
+
+def linearization_block(edge_bounds, weight_bound, indicator=False, skip=None):
+
+    # over x (m edges), z (m edges) and w of a path: z <= M_e x, w - (1 - x) W <= z, z <= w,
+    # with M_e the bound of every edge (in the order of graph_edges) and W the bound of w;
+    # only the first rows with indicator constraints, which replace the other two, and no
+    # rows for the edges flagged in skip (linearized otherwise by the caller)
+    m = len(edge_bounds)
+    rows, sense, rhs = list(), list(), list()
+    for j, bound in enumerate(edge_bounds):
+        if skip and skip[j]:
+            continue
+        if indicator:
+            rows += [[(m + j, 1), (j, -bound)]]
+            sense += ['<']
+            rhs += [0]
+        else:
+            rows += [[(m + j, 1), (j, -bound)], [(2 * m, 1), (j, weight_bound), (m + j, -1)], [(m + j, 1), (2 * m, -1)]]
+            sense += ['<', '<', '<']
+            rhs += [0, weight_bound, 0]
+
+    return sparse_block(rows, 2 * m + 1, sense, rhs)
+
+
+def subpath_block(graph, paths):
+
+    # over x (m edges) and r of a path: the edges of subpath s are all in the path when r[s] is 1
+    index = {e: j for j, e in enumerate(graph_edges(graph))}
+    m = len(index)
+    rows = [[(index[u, v, 0], 1) for (u, v) in path] + [(m + s, -len(path))] for s, path in enumerate(paths)]
+
+    return sparse_block(rows, m + len(paths), ['>'] * len(paths), [0] * len(paths))
+
+
+def add_block(model, block, variables):
+
+    matrix, sense, rhs = block
+    return model.addMConstr(matrix, variables, sense, rhs)
+
+
+def variable_names(name, T):
+
+    return [f"{name}[{','.join(map(str, t))}]" for t in T]
+
+
+def stack(*variables):
+
+    # the variables of several blocks (arrays from addMVar, or single variables) as one
+    # list, which addMConstr accepts from every backend
+    return [v for block in variables for v in (block.tolist() if hasattr(block, 'tolist') else [block])]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import math
+
+## Presolve of the flow intervals of mfd_inexact.py. The flow of the decomposition is
+## conserved at every node other than the sources and sinks, so the flow of an edge
+## into a node is at most the upper flow out of the node minus the lower flow of the
+## other edges into it (and at least the lower flow out of it minus their upper
+## flow), and likewise for the edges out of the node. The flow of every edge is also
+## a sum of integer weights, so its interval is rounded inwards. The intervals are
+## tightened node by node until no interval changes (or for a fixed number of rounds),
+## which detects inputs without any flow between their lower and upper flows before
+## an ILP is built, leaves edges with equal lower and upper flows for exact rows of the
+## ILP, and lowers the upper flows that flow_bounds uses as big-M values.
+
+# slack of the rounding of input flows that are integers up to floating point errors
+TOLERANCE = 1e-6
+
+
+def conservation_rows(graph, sources, sinks):
+
+    # the edges into and out of every node where the flow is conserved, by endpoints
+    # (parallel edges are listed once each, and share the interval of their endpoints);
+    # with one source and one sink, the flow out of the source also enters the sink
+    rows = [([(u, v) for u, v, _ in graph.in_edges(n, keys=True)], [(u, v) for u, v, _ in graph.out_edges(n, keys=True)])
+            for n in graph.nodes if n not in sources and n not in sinks]
+    if len(sources) == 1 and len(sinks) == 1:
+        rows.append(([(u, v) for u, v, _ in graph.in_edges(sinks[0], keys=True)], [(u, v) for u, v, _ in graph.out_edges(sources[0], keys=True)]))
+
+    return rows
+
+
+def tighten_row(lower, upper, into, out):
+
+    # new intervals of the edges of one node from the sums of the current ones
+    low_in, high_in = sum(lower[e] for e in into), sum(upper[e] for e in into)
+    low_out, high_out = sum(lower[e] for e in out), sum(upper[e] for e in out)
+    changed = set()
+    for side, low_other, high_other, low_side, high_side in [(into, low_out, high_out, low_in, high_in), (out, low_in, high_in, low_out, high_out)]:
+        for e in set(side):
+            low, high = max(lower[e], low_other - (high_side - upper[e])), min(upper[e], high_other - (low_side - lower[e]))
+            if (low, high) != (lower[e], upper[e]):
+                lower[e], upper[e] = low, high
+                changed.add(e)
+
+    return changed
+
+
+def propagate_intervals(data, rounds=100):
+
+    graph = data['graph']
+    lower, upper = data['lower flow'], data['upper flow']
+    edges = {(u, v) for u, v in graph.edges()}
+    low = {e: max(0, math.ceil(lower[e] - TOLERANCE)) for e in edges}
+    high = {e: math.floor(upper[e] + TOLERANCE) for e in edges}
+    rows = conservation_rows(graph, data['sources'], data['sinks'])
+
+    # rows are visited again only while an edge of theirs has changed
+    edge_rows = dict()
+    for r, (into, out) in enumerate(rows):
+        for e in into + out:
+            edge_rows.setdefault(e, set()).add(r)
+    pending = set(range(len(rows)))
+    for _ in range(rounds):
+        if not pending or any(low[e] > high[e] for e in edges):
+            break
+        changed = set()
+        for r in sorted(pending):
+            changed |= tighten_row(low, high, *rows[r])
+        pending = {r for e in changed for r in edge_rows[e]}
+
+    feasible = all(low[e] <= high[e] for e in edges)
+    data['presolve'] = {
+        'tightened': sum(1 for e in edges if (low[e], high[e]) != (lower[e], upper[e])),
+        'exact': sum(1 for e in edges if low[e] == high[e]),
+        'infeasible': 0 if feasible else 1,
+    }
+    if not feasible:
+        return False
+
+    # the flow of every edge stays the middle of its interval, as in get_edge
+    for e in edges:
+        lower[e], upper[e] = low[e], high[e]
+    for u, v, i in graph.edges(keys=True):
+        graph.edges[u, v, i]['flow'] = (low[u, v] + high[u, v]) / 2
+    data['max_flow_value'] = max(graph.edges(data='flow'), key=lambda e: e[-1])[-1]
+
+    return True
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+## Pruning of the subpath constraints of mfd_subpath.py. A path covers a subpath when
+## it uses all the edges of the subpath, so a subpath whose edges are all in another
+## subpath (an exact duplicate, or a contiguous part of a longer one) is covered by
+## every decomposition covering the other one, and its constraint is dropped. The
+## subpaths are indexed by edge: the subpaths that may contain a subpath are only the
+## ones listed under its rarest edge, and the subpaths covered by a path of a solution
+## are counted edge by edge from the index instead of testing every subpath.
+
+def edge_index(paths):
+
+    index = dict()
+    for s, path in enumerate(paths):
+        for e in set(path):
+            index.setdefault(e, list()).append(s)
+
+    return index
+
+
+def prune_subpaths(subpath):
+
+    paths = subpath['paths']
+    edges = [frozenset(path) for path in paths]
+
+    # the longest subpaths first, so that a subpath is only tested against the kept ones
+    # that may contain it; among duplicates the first one is kept. Empty subpaths are
+    # covered by any path.
+    kept, index = list(), dict()
+    for s in sorted(range(len(paths)), key=lambda s: (-len(edges[s]), s)):
+        if not edges[s]:
+            continue
+        candidates = min((index.get(e, ()) for e in edges[s]), key=len)
+        if any(edges[s] <= edges[t] for t in candidates):
+            continue
+        kept.append(s)
+        for e in edges[s]:
+            index.setdefault(e, list()).append(s)
+
+    # the kept subpaths stay in their input order
+    kept.sort()
+    return dict(subpath, n=len(kept), paths=[paths[s] for s in kept])
+
+
+def covered_subpaths(index, paths, edges):
+
+    # the subpaths with all their edges among the given edges
+    hits = dict()
+    for e in set(edges):
+        for s in index.get(e, ()):
+            hits[s] = hits.get(s, 0) + 1
+
+    return {s for s, count in hits.items() if count == len(set(paths[s]))}
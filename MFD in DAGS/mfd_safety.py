@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import time
+import networkx as nx
+
+## Safe paths of a flow in a DAG, shared by the solvers in this folder. A path
+## P = e_1 ... e_m is safe (a subpath of some path in every flow decomposition)
+## when its excess
+##
+##   f(e_1) - sum over the inner nodes v of P of the flow leaving v outside P
+##
+## is positive, and the excess is then a lower bound on the total weight of the
+## decomposition paths containing P. For inexact flows the lower flow of e_1 and
+## the upper flows of the leaving edges are used, which keeps the bound valid for
+## every flow between the two.
+
+def edge_bounds(data):
+
+    graph = data['graph']
+    edges = list(graph.edges(keys=True))
+    if 'lower flow' in data:
+        lower, upper = data['lower flow'], data['upper flow']
+        return {e: lower[e[0], e[1]] for e in edges}, {e: upper[e[0], e[1]] for e in edges}
+
+    flow = {e: graph.edges[e]['flow'] for e in edges}
+    return flow, flow
+
+
+def candidate_paths(data, upper):
+
+    # every safe path is a subpath of some path of any flow decomposition; without a
+    # decomposition, take for every edge the source-to-sink path following the heaviest edges
+    if data.get('greedy'):
+        return data['greedy'][1]
+
+    graph = data['graph']
+    candidates = set()
+    for e in graph.edges(keys=True):
+        path = [e]
+        while graph.out_degree(path[-1][1]) > 0:
+            path.append(max(graph.out_edges(path[-1][1], keys=True), key=upper.get))
+        while graph.in_degree(path[0][0]) > 0:
+            path.insert(0, max(graph.in_edges(path[0][0], keys=True), key=upper.get))
+        candidates.add(tuple(path))
+
+    return [list(path) for path in candidates]
+
+
+def maximal_safe_subpaths(path, lower, upper, out_upper):
+
+    # two pointers over the path: for every start, extend the window while the excess stays positive
+    def leakage(m):
+        return out_upper[path[m][1]] - upper[path[m + 1]]
+
+    safe, j, leak, last_end = list(), 0, 0, -1
+    for i in range(len(path)):
+        if j < i:
+            j, leak = i, 0
+        while j + 1 < len(path) and lower[path[i]] - leak - leakage(j) > 0:
+            leak += leakage(j)
+            j += 1
+        if lower[path[i]] - leak > 0 and j > last_end:
+            safe.append((lower[path[i]] - leak, path[i:j + 1]))
+            last_end = j
+        if j > i:
+            leak -= leakage(i)
+
+    return safe
+
+
+def safe_paths(data):
+
+    graph = data['graph']
+    lower, upper = edge_bounds(data)
+    out_upper = {v: sum(upper[e] for e in graph.out_edges(v, keys=True)) for v in graph.nodes}
+
+    safe = dict()
+    for path in candidate_paths(data, upper):
+        for excess, subpath in maximal_safe_subpaths(path, lower, upper, out_upper):
+            safe[tuple(subpath)] = excess
+
+    return [(excess, list(path)) for path, excess in safe.items()]
+
+
+def reachability(graph):
+
+    # bitmask of the nodes reachable from every node
+    index = {v: n for n, v in enumerate(graph.nodes)}
+    reach = dict()
+    for v in reversed(list(nx.topological_sort(graph))):
+        reach[v] = 0
+        for w in graph.successors(v):
+            reach[v] |= reach[w] | (1 << index[w])
+
+    return lambda u, v: u == v or bool(reach[u] >> index[v] & 1)
+
+
+def select_fixed_paths(data, safe):
+
+    # safe paths with pairwise incompatible representative edges (no source-to-sink path
+    # goes through two of them) lie in distinct paths of every decomposition, so the j-th
+    # one can be assigned to path j without loss of generality; the representative is the
+    # edge of least flow, which is compatible with the fewest other edges
+    reaches = reachability(data['graph'])
+    _, upper = edge_bounds(data)
+
+    def compatible(e, f):
+        return e == f or reaches(e[1], f[0]) or reaches(f[1], e[0])
+
+    fixed, representatives = list(), list()
+    for _, path in sorted(safe, key=lambda s: (-len(s[1]), -s[0])):
+        candidates = [e for e in path if not any(compatible(e, f) for f in representatives)]
+        if candidates:
+            r = min(candidates, key=upper.get)
+            fixed.append(path)
+            representatives.append(r)
+
+    return fixed
+
+
+def reorder_greedy(data, fixed):
+
+    # move the greedy path containing the j-th fixed safe path to position j, so that the
+    # greedy MIP start agrees with the fixed variables
+    if not data.get('greedy'):
+        return
+
+    weights, paths = data['greedy']
+    order = list()
+    for path in fixed:
+        k = next((k for k in range(len(paths)) if k not in order and set(path) <= set(paths[k])), None)
+        if k is None:
+            return
+        order.append(k)
+
+    order += [k for k in range(len(paths)) if k not in order]
+    data['greedy'] = [weights[k] for k in order], [paths[k] for k in order]
+
+
+def compute_safety(data):
+
+    start = time.perf_counter()
+    safe = safe_paths(data)
+    fixed = select_fixed_paths(data, safe)
+    reorder_greedy(data, fixed)
+
+    data['fixed_paths'] = fixed
+    data['safety'] = {'safe paths': len(safe), 'fixed paths': len(fixed), 'fixed variables': 0, 'compute time': time.perf_counter() - start}
+    return data
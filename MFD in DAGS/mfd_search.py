@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+## Search for the smallest number of paths for which fd_fixed_size(data, size)
+## finds a flow decomposition, shared by the solvers in this folder and in
+## 'MFD with Cycles'.
+##
+## The search keeps a bracket in data['search']: the largest size proved infeasible
+## and the smallest size known to be feasible, together with the outcome of every
+## size solved. It stops as soon as the two are adjacent, and searching the same
+## graph again never solves a size inside the bracket twice.
+##
+## Only a solve proving its size infeasible (message 'infeasible') moves the proved
+## lower bound. A solve can also run out of time (message 'timeout') or end without
+## a result (a solver error, or a status without a proof): its size is then skipped
+## like an infeasible one, but the proved lower bound does not move. When the sizes
+## between the proved lower bound and the best decomposition are not all decided,
+## the best decomposition known (from the ILP, or else the greedy one in
+## data['greedy'] if it has more paths than the proved lower bound) is returned with
+## the message 'timeout' if one of these sizes ran out of time, and 'unsolved' if they
+## all ended without a result.
+##
+## With weights of at least 1 (mfd_subpath.py, mfd_pc.py) a size above the number
+## of paths the flow can carry is infeasible, so feasibility is monotone only up to
+## some size: these solvers pass the largest size that can be feasible, sizes above
+## it are never solved, and until a feasible size is known the sizes are searched
+## one by one from the lower bound, so that no infeasible size above the smallest
+## feasible one is taken as a proof.
+
+import time
+
+SEARCH_STRATEGIES = ['linear', 'binary', 'galloping']
+
+
+def solve_budget(data, time_limit=None):
+
+    # seconds for the next solve: the per-solve limit, capped by what is left of the
+    # per-graph budget ending at data['deadline']; None for no limit
+    budget = time_limit
+    if data.get('deadline') is not None:
+        left = max(0, data['deadline'] - time.perf_counter())
+        budget = left if budget is None else min(budget, left)
+
+    return budget
+
+
+def probe_size(data, fd_fixed_size, size):
+
+    search = data['search']
+    data = fd_fixed_size(data, size)
+    search['sizes'][size] = data['message']
+
+    if data['message'] == 'solved':
+        search['feasible'] = size
+        search['best'] = (size, data['weights'], data['solution'], data.get('runtime', 0))
+        return True
+
+    if data['message'] == 'infeasible':
+        search['infeasible'] = max(search['infeasible'], size)
+    else:
+        search['timeout'] = max(search['timeout'], size)
+    if data['message'] == 'timeout':
+        search['time limit'] = max(search['time limit'], size)
+    return False
+
+
+def next_size(search, strategy, step, max_size, monotone=True):
+
+    infeasible, feasible = max(search['infeasible'], search['timeout']), search['feasible']
+    if strategy == 'linear' or not monotone and feasible is None:
+        return infeasible + 1
+
+    # galloping moves up from the infeasible side in doubling steps until a solved size
+    # is found, binary search bisects as soon as some feasible size is known
+    if strategy == 'galloping' and step > 0 or feasible is None:
+        return min(infeasible + max(step, 1), max_size if feasible is None else feasible - 1)
+
+    return (infeasible + feasible) // 2
+
+
+def search_size(data, fd_fixed_size, low, high=None, strategy='binary', max_size=None):
+
+    search = data.setdefault('search', {'infeasible': low - 1, 'timeout': low - 1, 'feasible': None, 'best': None, 'sizes': dict()})
+    # the largest size that ran out of time, apart from the sizes that ended without a result
+    search.setdefault('time limit', low - 1)
+    search['strategy'] = strategy
+    search['infeasible'] = max(search['infeasible'], low - 1)
+    if high is not None and (search['feasible'] is None or high < search['feasible']):
+        search['feasible'] = high
+
+    # max_size is only given by the solvers with weights of at least 1
+    monotone = max_size is None
+    max_size = len(data['graph'].edges) if monotone else max_size
+    step = 1
+
+    def floor():
+        return max(search['infeasible'], search['timeout'])
+
+    while (search['feasible'] is None and floor() < max_size) or (search['feasible'] is not None and search['feasible'] - floor() > 1):
+        if probe_size(data, fd_fixed_size, next_size(search, strategy, step, max_size, monotone)):
+            step = 0
+        elif step > 0:
+            step *= 2
+
+    # the smallest feasible size may only be known from a heuristic, solve it to get its paths;
+    # a heuristic the ILP proves infeasible is dropped and the search goes on above it
+    if search['feasible'] is not None and (search['best'] is None or search['best'][0] != search['feasible']):
+        if not probe_size(data, fd_fixed_size, search['feasible']) and search['infeasible'] >= search['feasible']:
+            search['feasible'], data['greedy'] = None, None
+            return search_size(data, fd_fixed_size, low, None, strategy, None if monotone else max_size)
+
+    if search['best'] is not None and search['best'][0] == search['feasible']:
+        _, data['weights'], data['solution'], data['runtime'] = search['best']
+    elif search['feasible'] is not None and data.get('greedy') and len(data['greedy'][1]) == search['feasible'] > search['infeasible']:
+        data['weights'], data['solution'] = data['greedy']
+    else:
+        data['weights'], data['solution'] = list(), list()
+
+    # solved only when no size below the decomposition is left undecided, and a timeout
+    # only when one of the undecided sizes ran out of time
+    if data['solution'] and len(data['solution']) == search['infeasible'] + 1:
+        data['message'] = 'solved'
+    else:
+        data['message'] = 'timeout' if search['time limit'] > search['infeasible'] else 'unsolved'
+
+    return data
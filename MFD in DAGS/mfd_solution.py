@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+## Reading the decomposition back from a solved model, shared by the solvers in this
+## folder and in 'MFD with Cycles'. The values of all the x and w variables are read
+## with one getAttr call each, and every path is listed by walking from its source
+## (or, for a cycle, from any of its edges) along the edges it uses. The trails and
+## walks of mfd_pc.py go through a node (and a walk through an edge) several times,
+## they are listed in the order of an Euler walk of their edges.
+
+def get_values(model, variables):
+
+    return model.getAttr('X', variables)
+
+
+def used_edges(x_values, size):
+
+    used = [list() for _ in range(size)]
+    for e, value in x_values.items():
+        if value > 0.5:
+            used[e[-1]].append(e[:-1])
+
+    return used
+
+
+def walk_path(edges, sources):
+
+    successors = {e[0]: e for e in edges}
+    start = next((s for s in sources if s in successors), edges[0][0] if edges else None)
+
+    path, v = list(), start
+    while v in successors and not (path and v == start) and len(path) < len(edges):
+        path.append(successors[v])
+        v = path[-1][1]
+
+    # edges the walk cannot reach (the model allows them only with several sources) keep their order
+    walked = set(path)
+    return path + [e for e in sorted(edges) if e not in walked]
+
+
+def extract_paths(model, data, x, w, size):
+
+    weights = get_values(model, w)
+    used = used_edges(get_values(model, x), size)
+
+    return [round(weights[k]) for k in range(size)], [walk_path(used[k], data['sources']) for k in range(size)]
+
+
+def walk_edges(x_values, size):
+
+    # the edges used by every walk, each as many times as the walk uses it
+    used = [list() for _ in range(size)]
+    for e, value in x_values.items():
+        used[e[-1]] += [e[:-1]] * round(value)
+
+    return used
+
+
+def euler_walk(edges, sources):
+
+    # Hierholzer's algorithm from the source used (or, for a closed walk, from the
+    # first edge), the edges out of every node taken in their order
+    successors = dict()
+    for e in reversed(edges):
+        successors.setdefault(e[0], list()).append(e)
+    start = next((s for s in sources if s in successors), edges[0][0] if edges else None)
+
+    walk, stack = list(), [(None, start)]
+    while stack:
+        e, v = stack[-1]
+        if successors.get(v):
+            f = successors[v].pop()
+            stack.append((f, f[1]))
+        else:
+            stack.pop()
+            if e is not None:
+                walk.append(e)
+
+    # edges the walk cannot reach (the model allows them only with several sources) follow it
+    return walk[::-1] + [e for v in successors for e in reversed(successors[v])]
+
+
+def extract_walks(model, data, x, w, size):
+
+    weights = get_values(model, w)
+    used = walk_edges(get_values(model, x), size)
+
+    return [round(weights[k]) for k in range(size)], [euler_walk(used[k], data['sources']) for k in range(size)]
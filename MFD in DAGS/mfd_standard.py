@@ -3,13 +3,39 @@
 
 import os
 import sys
+import time
 import argparse
 import networkx as nx
-import gurobipy as gp
-from gurobipy import GRB
 from collections import deque
 from bisect import bisect
 from copy import deepcopy
+from mfd_backend import GRB, new_model, empty_expression, backend_available, SOLVER_ERRORS, BACKENDS
+from mfd_bounds import lower_bound, greedy_decomposition, flow_bounds, LINEARIZATIONS
+from mfd_search import search_size, solve_budget, SEARCH_STRATEGIES
+from mfd_batch import map_graphs, read_blocks
+from mfd_compress import compress_graph, expand_paths
+from mfd_safety import compute_safety
+from mfd_symmetry import add_symmetry_constraints, sort_greedy, SYMMETRY_BREAKING
+from mfd_matrix import conservation_block, linearization_block, add_block, variable_names, stack
+from mfd_solution import extract_paths
+from mfd_cache import graph_key, load_result, store_result
+from mfd_warmstart import start_decomposition
+from mfd_components import map_components
+
+backend = 'gurobi'
+incremental = False
+search_strategy = 'binary'
+time_limit = None
+graph_time_limit = None
+compress = False
+safety = False
+symmetry = list()
+matrix = False
+linearization = 'edge'
+warm_start = False
+cache = None
+cache_size = 10000
+components = False
 
 def get_edge(raw_edge):
 
@@ -34,90 +60,199 @@ def get_graph(raw_graph):
         return graph
 
 
-def read_input_graphs(graph_file):
+def stream_input_graphs(graph_file):
 
-    graphs_raw = open(graph_file, 'r').read().split('#')[1:]
-    return [get_graph(raw_g) for raw_g in graphs_raw]
+    for raw_g in read_blocks(graph_file):
+        yield get_graph(raw_g)
 
 def read_input(graph_file):
 
-    return read_input_graphs(graph_file)
+    return stream_input_graphs(graph_file)
 
 
 def mfd_algorithm(data):
     data['runtime'] = 0
     data['message'] = 'unsolved'
-    for i in range(2, len(data['graph'].edges) + 1):
-        if fd_fixed_size(data, i)['message'] == 'solved':
-            return data
-
+    data['timings'] = list()
+    data['deadline'] = time.perf_counter() + graph_time_limit if graph_time_limit is not None else None
+    if compress:
+        compress_graph(data)
+    data['flow bounds'] = flow_bounds(data, linearization)
+    data['greedy'] = greedy_decomposition(data)
+    upper = len(data['greedy'][1]) if data['greedy'] else None
+    if safety:
+        compute_safety(data)
+    if symmetry:
+        sort_greedy(data, symmetry)
+    search_size(data, fd_fixed_size, lower_bound(data), upper, search_strategy)
+
+    release_ilp_model(data)
+    if compress:
+        data['solution'] = expand_paths(data, data.get('solution', list()))
     return data
 
-def build_base_ilp_model(data, size):
+def create_ilp_model(data):
 
     graph = data['graph']
-    max_flow_value = data['max_flow_value']
-    sources = data['sources']
-    sinks = data['sinks']
-
-    # create extra sets
-    T = [(u, v, i, k) for (u, v, i) in graph.edges(keys=True) for k in range(size)]
-    SC = list(range(size))
 
     # Create a new model
-    model = gp.Model('MFD')
+    model = new_model('MFD', backend)
     model.setParam('LogToConsole', 0)
     model.setParam('Threads', threads)
 
+    # flow balance, the z variables of each path are added to these rows by add_path
+    balance = {(u, v, i): model.addConstr(empty_expression(model) == f) for (u, v, i, f) in graph.edges(keys=True, data='flow')}
+
+    return {
+        'model': model,
+        'size': 0,
+        'x': dict(),
+        'w': dict(),
+        'z': dict(),
+        'balance': balance,
+        'path_constrs': list(),
+    }
+
+def add_path(ilp, data):
+
+    graph = data['graph']
+    edge_bound, weight_bound = data['flow bounds']
+    sources = data['sources']
+    sinks = data['sinks']
+    model, x, z = ilp['model'], ilp['x'], ilp['z']
+    k = ilp['size']
+
+    # create extra sets
+    T = [(u, v, i, k) for (u, v, i) in graph.edges(keys=True)]
 
     # Create variables
-    x = model.addVars(T, vtype=GRB.BINARY, name='x')
-    w = model.addVars(SC, vtype=GRB.INTEGER, name='w', lb=0)
-    z = model.addVars(T, vtype=GRB.CONTINUOUS, name='z', lb=0)
+    x.update(model.addVars(T, vtype=GRB.BINARY, name='x'))
+    w = ilp['w'][k] = model.addVar(vtype=GRB.INTEGER, name=f'w[{k}]', lb=0, ub=weight_bound)
+    z.update(model.addVars(T, vtype=GRB.CONTINUOUS, name='z', lb=0))
+    constrs = list()
 
     # flow conservation
-    for k in range(size):
-        for v in graph.nodes:
-            if v in sources:
-                model.addConstr(sum(x[v, w, i, k] for _, w, i in graph.out_edges(v, keys=True)) == 1)
-            if v in sinks:
-                model.addConstr(sum(x[u, v, i, k] for u, _, i in graph.in_edges(v, keys=True)) == 1)
-            if v not in sources and v not in sinks:
-                model.addConstr(sum(x[v, w, i, k] for _, w, i in graph.out_edges(v, keys=True)) - sum(x[u, v, i, k] for u, _, i in graph.in_edges(v, keys=True)) == 0)
+    for v in graph.nodes:
+        if v in sources:
+            constrs.append(model.addConstr(sum(x[v, y, i, k] for _, y, i in graph.out_edges(v, keys=True)) == 1))
+        if v in sinks:
+            constrs.append(model.addConstr(sum(x[u, v, i, k] for u, _, i in graph.in_edges(v, keys=True)) == 1))
+        if v not in sources and v not in sinks:
+            constrs.append(model.addConstr(sum(x[v, y, i, k] for _, y, i in graph.out_edges(v, keys=True)) - sum(x[u, v, i, k] for u, _, i in graph.in_edges(v, keys=True)) == 0))
 
     # flow balance
-    for (u, v, i, f) in graph.edges(keys=True, data='flow'):
-        model.addConstr(f == sum(z[u, v, i, k] for k in range(size)))
+    for (u, v, i) in graph.edges(keys=True):
+        model.chgCoeff(ilp['balance'][u, v, i], z[u, v, i, k], 1)
 
-    # linearization
+    # linearization, with indicator constraints for w - (1 - x) W <= z <= w
     for (u, v, i) in graph.edges(keys=True):
-        for k in range(size):
-            model.addConstr(z[u, v, i, k] <= max_flow_value * x[u, v, i, k])
-            model.addConstr(w[k] - (1 - x[u, v, i, k]) * max_flow_value <= z[u, v, i, k])
-            model.addConstr(z[u, v, i, k] <= w[k])
+        constrs.append(model.addConstr(z[u, v, i, k] <= edge_bound[u, v, i] * x[u, v, i, k]))
+        if linearization == 'indicator':
+            constrs.append(model.addGenConstrIndicator(x[u, v, i, k], True, z[u, v, i, k] - w == 0))
+        else:
+            constrs.append(model.addConstr(w - (1 - x[u, v, i, k]) * weight_bound <= z[u, v, i, k]))
+            constrs.append(model.addConstr(z[u, v, i, k] <= w))
 
-    return model, x, w, z
+    # symmetry breaking with path k - 1
+    if symmetry:
+        constrs += add_symmetry_constraints(model, data, x, ilp['w'], k, symmetry)
 
+    ilp['path_constrs'].append(constrs)
+    ilp['size'] += 1
 
-def get_solution(model, data, size):
+    return ilp
 
-    data['weights'], data['solution'] = list(), list()
+def path_blocks(data):
 
-    if model.status == GRB.OPTIMAL:
-        graph = data['graph']
-        T = [(u, v, i, k) for (u, v, i) in graph.edges(keys=True) for k in range(size)]
+    graph = data['graph']
+    edge_bound, weight_bound = data['flow bounds']
+    return {
+        'conservation': conservation_block(graph, data['sources'], data['sinks']),
+        'linearization': linearization_block([edge_bound[e] for e in graph.edges(keys=True)], weight_bound, linearization == 'indicator'),
+    }
+
+def add_path_matrix(ilp, data):
+
+    graph = data['graph']
+    model, x, z = ilp['model'], ilp['x'], ilp['z']
+    k = ilp['size']
+    if 'blocks' not in data:
+        data['blocks'] = path_blocks(data)
+    blocks = data['blocks']
+    _, weight_bound = data['flow bounds']
+
+    # create extra sets
+    T = [(u, v, i, k) for (u, v, i) in graph.edges(keys=True)]
+
+    # Create variables, named as in add_path
+    xk = model.addMVar(len(T), vtype=GRB.BINARY, name=variable_names('x', T))
+    w = ilp['w'][k] = model.addVar(vtype=GRB.INTEGER, name=f'w[{k}]', lb=0, ub=weight_bound)
+    zk = model.addMVar(len(T), vtype=GRB.CONTINUOUS, name=variable_names('z', T), lb=0)
+    x.update(zip(T, xk.tolist()))
+    z.update(zip(T, zk.tolist()))
+
+    # flow conservation
+    constrs = [add_block(model, blocks['conservation'], xk)]
+
+    # flow balance
+    for (u, v, i) in graph.edges(keys=True):
+        model.chgCoeff(ilp['balance'][u, v, i], z[u, v, i, k], 1)
+
+    # linearization, with indicator constraints for w - (1 - x) W <= z <= w
+    constrs.append(add_block(model, blocks['linearization'], stack(xk, zk, w)))
+    if linearization == 'indicator':
+        constrs += [model.addGenConstrIndicator(xe, True, ze - w == 0) for xe, ze in zip(xk.tolist(), zk.tolist())]
+
+    # symmetry breaking with path k - 1
+    if symmetry:
+        constrs += add_symmetry_constraints(model, data, x, ilp['w'], k, symmetry)
+
+    ilp['path_constrs'].append(constrs)
+    ilp['size'] += 1
+
+    return ilp
+
+def remove_path(ilp):
+
+    model, x, z = ilp['model'], ilp['x'], ilp['z']
+    k = ilp['size'] - 1
+
+    # removing the z variables also drops them from the flow balance rows
+    T = [e for e in x if e[-1] == k]
+    model.remove([x.pop(e) for e in T] + [z.pop(e) for e in T] + [ilp['w'].pop(k)])
+    model.remove(ilp['path_constrs'].pop())
+    ilp['size'] -= 1
+
+    return ilp
+
+def resize_ilp_model(ilp, data, size):
+
+    while ilp['size'] < size:
+        (add_path_matrix if matrix else add_path)(ilp, data)
+    while ilp['size'] > size:
+        remove_path(ilp)
+    ilp['model'].update()
+
+    return ilp
 
-        w_sol = [0] * len(range(size))
-        paths = [list() for _ in range(size)]
-        for k in range(size):
-            w_sol[k] = round(model.getVarByName(f'w[{k}]').x)
-        for (u, v, i, k) in T:
-            if round(model.getVarByName(f'x[{u},{v},{i},{k}]').x) == 1:
-                paths[k].append((u, v, i))
-        for k in range(len(paths)):
-            paths[k] = sorted(paths[k])
+def release_ilp_model(data):
 
-        data['weights'], data['solution'] = w_sol, paths
+    if 'ilp' in data:
+        data.pop('ilp')['model'].dispose()
+    data.pop('blocks', None)
+
+def build_base_ilp_model(data, size):
+
+    ilp = resize_ilp_model(create_ilp_model(data), data, size)
+    return ilp['model'], ilp['x'], ilp['w'], ilp['z']
+
+
+def get_solution(model, data, x, w, size):
+
+    data['weights'], data['solution'] = list(), list()
+
+    if model.status == GRB.OPTIMAL:
+        data['weights'], data['solution'] = extract_paths(model, data, x, w, size)
 
     return data
 
@@ -128,28 +263,86 @@ def update_status(data, model):
         data['message'] = 'solved'
         data['runtime'] += model.Runtime
 
-    if model.status == GRB.INFEASIBLE:
-        data['message'] = 'unsolved'
+    # without an objective the model is never unbounded, so both prove the size infeasible;
+    # any other status leaves the message unsolved, which the search does not take as a proof
+    if model.status in (GRB.INFEASIBLE, GRB.INF_OR_UNBD):
+        data['message'] = 'infeasible'
         data['runtime'] = 0
 
+    if model.status == GRB.TIME_LIMIT:
+        data['message'] = 'timeout'
+
 
     return data
 
 
+def set_mip_start(x, w, z, weights, paths):
+
+    # the paths after the given ones are left for the solver to complete
+    paths = [set(path) for path in paths]
+    for k in w:
+        w[k].Start = weights[k] if k < len(paths) else GRB.UNDEFINED
+    for e in x:
+        if e[-1] < len(paths):
+            used = e[:-1] in paths[e[-1]]
+            x[e].Start = 1 if used else 0
+            z[e].Start = weights[e[-1]] if used else 0
+        else:
+            x[e].Start = z[e].Start = GRB.UNDEFINED
+
+
+def fix_safe_paths(x, data, size):
+
+    # the j-th fixed safe path is a subpath of path j
+    fixed = 0
+    for k, path in enumerate(data['fixed_paths'][:size]):
+        for e in path:
+            x[e + (k,)].LB = 1
+            fixed += 1
+
+    return fixed
+
+
 def fd_fixed_size(data, size):
 
     # calculate a flow decomposition into size paths
+    data['message'] = 'unsolved'
+    budget = solve_budget(data, time_limit)
+    if budget is not None and budget <= 0:
+        data['message'] = 'timeout'
+        return data
+
     try:
-        # Create a new model
-        model, _, _, _ = build_base_ilp_model(data, size)
+        # Create a new model, or resize the one kept from the previous size
+        start = time.perf_counter()
+        if incremental:
+            if 'ilp' not in data:
+                data['ilp'] = create_ilp_model(data)
+            ilp = resize_ilp_model(data['ilp'], data, size)
+            model, x, w, z = ilp['model'], ilp['x'], ilp['w'], ilp['z']
+        else:
+            model, x, w, z = build_base_ilp_model(data, size)
+
+        # warm start from the greedy decomposition when it has exactly size paths, or
+        # from a decomposition with more paths (see mfd_warmstart.py)
+        decomposition = start_decomposition(data, size, warm_start, symmetry)
+        if decomposition:
+            set_mip_start(x, w, z, *decomposition)
+        if safety:
+            data['safety']['fixed variables'] = fix_safe_paths(x, data, size)
+        if budget is not None:
+            model.setParam('TimeLimit', budget)
+        build_time = time.perf_counter() - start
 
         # objective function
         model.optimize()
 
+        start = time.perf_counter()
         data = update_status(data, model)
-        data = get_solution(model, data, size)
+        data = get_solution(model, data, x, w, size)
+        data['timings'].append((size, build_time, model.Runtime, time.perf_counter() - start))
 
-    except gp.GurobiError as e:
+    except SOLVER_ERRORS as e:
         print(f'Error code {e.errno}: {e}', file=sys.stderr)
 
     except AttributeError:
@@ -178,6 +371,41 @@ def output_time(output,paths,time):
     output.write(' '.join([str(len(paths)),str(time)]))
     output.write('\n')
 
+def output_lower_bound(output,data):
+
+    bound, name = data['lower_bound']
+    tight = 'tight' if len(data['solution']) == bound else 'not tight'
+    output.write(f'lower bound {name} {bound} {tight}\n')
+
+def output_search(output,data):
+
+    search = data['search']
+    output.write(f"search {search['strategy']} infeasible {search['infeasible']} feasible {search['feasible']}\n")
+    output.write(f"status {data['message']} lower {search['infeasible'] + 1} paths {len(data['solution'])}\n")
+
+def output_compression(output,data):
+
+    before, after = data['compression']
+    output.write(f'compression {before} {after}\n')
+
+def output_safety(output,data):
+
+    safety = data['safety']
+    output.write(f"safety {safety['safe paths']} {safety['fixed paths']} {safety['fixed variables']} {safety['compute time']}\n")
+
+def output_components(output,data):
+
+    output.write(f"components {data['components']}\n")
+
+def output_cache(output,data):
+
+    output.write(f"cache {data['cache']}\n")
+
+def output_timings(output,timings):
+
+    for (size,build_time,solve_time,extract_time) in timings:
+        output.write(f'{size} {build_time} {solve_time} {extract_time}\n')
+
 def compute_graph_metadata(graph):
 
     # creation of NetworkX Graph
@@ -196,51 +424,153 @@ def compute_graph_metadata(graph):
         'max_flow_value': max(ngraph.edges(data='flow'), key=lambda e: e[-1])[-1] if len(ngraph.edges) > 0 else -1,
     }
 
-def solve_instances(graphs,output_file):
+def solve_graph(graph):
+
+    if not graph['edges']:
+        return None
+
+    mfd = compute_graph_metadata(graph)
+
+    if len(mfd['graph'].edges) == 0:
+        return None
+
+    key = graph_key('standard', graph['edges']) if cache else None
+    if key is None or not load_result(cache, key, mfd):
+        mfd = mfd_algorithm(mfd)
+        if key is not None:
+            store_result(cache, key, mfd, cache_size)
+    mfd.pop('graph')
+    return mfd
+
+def init_worker(options):
+
+    # the solver options are module globals, they are set again in every worker process
+    globals().update(options)
+
+def solve_instances(graphs,output_file, output_stats=False, jobs=1, options=None):
 
     output = open(output_file, 'w+')
     output_simple = open(''.join([output_file,'.time']),'w+')
+    if output_stats:
+        stats = open(f'{output_file}.stats', 'w+')
 
-    for g, graph in enumerate(graphs):
+    results = (map_components if components else map_graphs)(solve_graph, ((graph,) for graph in graphs), jobs, init_worker, (options or dict(),))
+    cache_counts = {'hit': 0, 'miss': 0}
+    for g, mfd in enumerate(results):
         print("#graph ",g)
         output.write(f'# graph {g}\n')
+        if output_stats:
+            stats.write(f'# graph {g}\n')
 
-        if not graph['edges']:
-            continue
-
-        mfd = compute_graph_metadata(graph)
+        if mfd is not None:
 
-        if len(mfd['graph'].edges) > 0:
-
-            mfd = mfd_algorithm(mfd)
             paths,weights,time = mfd['solution'],mfd['weights'],mfd['runtime']
             output_paths(output,paths,weights)
+            if 'cache' in mfd:
+                cache_counts[mfd['cache']] += 1
+            if mfd['message'] == 'timeout':
+                print(f"INFO: Time limit reached for graph {g}, {len(paths)} paths found, at least {mfd['search']['infeasible'] + 1} needed")
             output_time(output_simple,paths,time)
-
+            if output_stats:
+                output_lower_bound(stats,mfd)
+                output_search(stats,mfd)
+                if 'components' in mfd:
+                    output_components(stats,mfd)
+                if 'cache' in mfd:
+                    output_cache(stats,mfd)
+                if 'compression' in mfd:
+                    output_compression(stats,mfd)
+                if 'safety' in mfd:
+                    output_safety(stats,mfd)
+                output_timings(stats,mfd['timings'])
+
+        output.flush()
+
+
+    if cache:
+        print(f"INFO: Cache {cache_counts['hit']} hits, {cache_counts['miss']} misses")
+        if output_stats:
+            stats.write(f"# cache hits {cache_counts['hit']} misses {cache_counts['miss']}\n")
 
     output.close()
+    if output_stats:
+        stats.close()
 
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser(
         description='''
         Computes maximal safe paths for Minimum Flow Decomposition.
-        This script uses the Gurobi ILP solver.
+        This script uses the Gurobi or the HiGHS ILP solver.
         ''',
         formatter_class=argparse.RawTextHelpFormatter
     )
 
+    parser.add_argument('-b', '--backend', type=str, default='gurobi', choices=BACKENDS,
+                        help='ILP solver used to build and solve the models (default gurobi).')
     parser.add_argument('-t', '--threads', type=int, default=0,
-                        help='Number of threads to use for the Gurobi solver; use 0 for all threads (default 0).')
+                        help='Number of threads to use for each ILP solve; use 0 for all threads, or 1 thread per solve with --jobs (default 0).')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of graphs solved in parallel by a pool of processes; use 0 for one process per CPU (default 1).')
+    parser.add_argument('-inc', '--incremental', action='store_true',
+                        help='Keep one ILP model across sizes, adding or removing the variables and constraints of a single path at a time.')
+    parser.add_argument('-ss', '--search', type=str, default='binary', choices=SEARCH_STRATEGIES,
+                        help='Strategy to search the number of paths (default binary):\n   linear (every size from the lower bound up),\n   binary (bisect between the largest infeasible and the smallest feasible size),\n   galloping (doubling steps up from the lower bound, then bisect).')
+    parser.add_argument('-cp', '--compress', action='store_true',
+                        help='Contract chains of nodes with in-degree and out-degree 1 before building the ILP.')
+    parser.add_argument('-sf', '--safety', action='store_true',
+                        help='Fix the variables of safe paths (subpaths of every flow decomposition) to distinct paths.')
+    parser.add_argument('-sb', '--symmetry', type=str, nargs='+', default=list(), choices=SYMMETRY_BREAKING,
+                        help='Symmetry breaking between the paths (default none):\n   weights (non-increasing weights),\n   source-edge (non-decreasing index of the edge out of the source, lexicographic with weights),\n   safe-paths (fix safe paths to the first paths, same as --safety).')
+    parser.add_argument('-mx', '--matrix', action='store_true',
+                        help='Build the constraints of every path from sparse matrices built once per graph (same model).')
+    parser.add_argument('-ws', '--warm-start', action='store_true',
+                        help='Warm start every size from the smallest decomposition known with more paths: paths with the same edges are merged, or else only its heaviest paths are kept and the solver completes the start.')
+    parser.add_argument('-lz', '--linearization', type=str, default='edge', choices=LINEARIZATIONS,
+                        help='Linearization of the product of the weight and the edge variables of a path (default edge):\n   global (the largest flow value as big-M),\n   edge (the flow of every edge, and a bound on the weight from the edges out of the sources, as big-M),\n   indicator (indicator constraints, gurobi only).')
+    parser.add_argument('-tl', '--time-limit', type=float,
+                        help='Time limit in seconds for each ILP solve (default none).')
+    parser.add_argument('-gtl', '--graph-time-limit', type=float,
+                        help='Time limit in seconds for each graph; when a limit is reached, the best decomposition known is output with status timeout (default none).')
+    parser.add_argument('-cc', '--components', action='store_true',
+                        help='Solve the weakly connected components of every graph separately (in parallel with --jobs) and output the union of their decompositions; the time limits apply to each component.')
+    parser.add_argument('-ch', '--cache', type=str,
+                        help='Folder of the cache of solved graphs; a graph already solved with the same flows (and subpaths) is read from it instead of solved (default no cache).')
+    parser.add_argument('-cs', '--cache-size', type=int, default=10000,
+                        help='Largest number of graphs kept in the cache, the least recently used are removed first (default 10000).')
+    parser.add_argument('-st', '--stats', action='store_true',
+                        help='Write the lower bound, the search, the compression, the safe paths (and the time to compute them) and the model build, solve and solution extraction time of every size tried to OUTPUT.stats.')
  
     requiredNamed = parser.add_argument_group('required arguments')
     requiredNamed.add_argument('-i', '--input', type=str, help='Input filename', required=True)
     requiredNamed.add_argument('-o', '--output', type=str, help='Output filename', required=True)
 
     args = parser.parse_args()
+    if not backend_available(args.backend):
+        parser.error(f'the {args.backend} backend is not installed')
+    if args.linearization == 'indicator' and args.backend != 'gurobi':
+        parser.error('indicator constraints need the gurobi backend')
 
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
     threads = args.threads
     if threads == 0:
-        threads = os.cpu_count()
-    print(f'INFO: Using {threads} threads for the Gurobi solver')
-    solve_instances(read_input(args.input),args.output)
+        threads = os.cpu_count() if jobs == 1 else 1
+    backend = args.backend
+    print(f'INFO: Using {threads} threads for the {backend} solver')
+    if jobs > 1:
+        print(f'INFO: Solving {jobs} graphs in parallel')
+    incremental = args.incremental
+    search_strategy = args.search
+    time_limit = args.time_limit
+    graph_time_limit = args.graph_time_limit
+    compress = args.compress
+    symmetry = args.symmetry
+    matrix = args.matrix
+    linearization = args.linearization
+    warm_start = args.warm_start
+    components = args.components
+    cache = args.cache
+    cache_size = args.cache_size
+    safety = args.safety or 'safe-paths' in symmetry
+    options = {'backend': backend, 'threads': threads, 'incremental': incremental, 'search_strategy': search_strategy, 'time_limit': time_limit, 'graph_time_limit': graph_time_limit, 'compress': compress, 'safety': safety, 'symmetry': symmetry, 'matrix': matrix, 'linearization': linearization, 'warm_start': warm_start, 'cache': cache, 'cache_size': cache_size, 'components': components}
+    solve_instances(read_input(args.input),args.output,args.stats,jobs,options)
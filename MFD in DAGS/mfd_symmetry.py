@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+## Symmetry breaking between the interchangeable paths of the ILP, shared by the
+## solvers in this folder and in 'MFD with Cycles'. The paths fixed to safe paths
+## (mfd_safety.py) come first; the remaining paths can be ordered by
+##   weights:     w[k-1] >= w[k]
+##   source-edge: the index of the edge out of the first source used by path k is
+##                non-decreasing (0 for cycles), with x fixed to 0 where path k cannot
+##                reach that index; together with weights, the order is lexicographic
+##                and the weights are only ordered among paths leaving by the same edge
+## The constraints only refer to paths k-1 and k, so they are added and removed with
+## path k by add_path/remove_path.
+
+SYMMETRY_BREAKING = ['weights', 'source-edge', 'safe-paths']
+
+
+def source_edge_order(data):
+
+    graph = data['graph']
+    source = data['sources'][0]
+    edges = graph.out_edges(source, keys=True) if graph.is_multigraph() else graph.out_edges(source)
+    return {e: n + 1 for n, e in enumerate(sorted(edges, key=lambda e: -graph.edges[e]['flow']))}
+
+
+def required_source_edges(data, order):
+
+    if 'lower flow' in data:
+        return all(data['lower flow'][e[0], e[1]] > 0 for e in order)
+
+    return all(data['graph'].edges[e]['flow'] > 0 for e in order)
+
+
+def first_free_path(data):
+
+    return len(data.get('fixed_paths', list()))
+
+
+def add_symmetry_constraints(model, data, x, w, k, symmetry):
+
+    constrs = list()
+    first = first_free_path(data)
+    if k < first or not data['sources']:
+        return constrs
+
+    order = source_edge_order(data)
+    position = lambda k: sum(n * x[e + (k,)] for e, n in order.items())
+    big_m = max(data['upper flow'].values()) if 'upper flow' in data else data['max_flow_value']
+
+    # every source edge carries a path, so once sorted, path k uses one of the first k + 1 edges
+    if 'source-edge' in symmetry and first == 0 and required_source_edges(data, order):
+        for e, n in order.items():
+            if n - 1 > k:
+                x[e + (k,)].UB = 0
+
+    if k == first:
+        return constrs
+
+    if 'source-edge' in symmetry:
+        constrs.append(model.addConstr(position(k - 1) <= position(k)))
+        if 'weights' in symmetry:
+            constrs.append(model.addConstr(w[k - 1] - w[k] >= -big_m * (position(k) - position(k - 1))))
+    elif 'weights' in symmetry:
+        constrs.append(model.addConstr(w[k - 1] >= w[k]))
+
+    return constrs
+
+
+def sort_paths(data, weights, paths, symmetry):
+
+    # order the paths of a decomposition like the constraints above, so that a MIP start
+    # from it stays feasible
+    if not data['sources']:
+        return weights, paths
+
+    order = source_edge_order(data)
+    first = first_free_path(data)
+
+    def key(k):
+        position = next((order[e] for e in paths[k] if e in order), 0) if 'source-edge' in symmetry else 0
+        return position, -weights[k] if 'weights' in symmetry else 0
+
+    free = sorted(range(first, len(paths)), key=key)
+    return weights[:first] + [weights[k] for k in free], paths[:first] + [paths[k] for k in free]
+
+
+def sort_greedy(data, symmetry):
+
+    if data.get('greedy'):
+        data['greedy'] = sort_paths(data, *data['greedy'], symmetry)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from mfd_symmetry import first_free_path, sort_paths
+
+## MIP starts for the ILP with `size` paths, shared by the solvers in this folder and in
+## 'MFD with Cycles'. The greedy decomposition is a complete start when it has exactly
+## size paths. With --warm-start, a size below the smallest decomposition known (the
+## greedy one, or the best ILP solution of the search) is also started from it:
+##   - paths using the same edges are merged into one path with the sum of their
+##     weights, which is again a decomposition of the same flow;
+##   - if more than size paths remain, only the paths fixed to safe paths and the paths
+##     heavier than all the lighter paths together are kept (such a path cannot be
+##     rebuilt from the others, and it is usually a path of the minimum decomposition),
+##     and the remaining paths of the start are left undefined, so the solver completes
+##     it by decomposing the flow of the dropped paths. Gurobi and HiGHS both complete
+##     partial starts with a small sub-MIP, and discard the start when it cannot be
+##     completed. Keeping more paths (e.g. all but the two lightest) makes the start
+##     fail far more often, since the light paths rarely merge into fewer paths.
+
+def merge_equal_paths(weights, paths):
+
+    merged = dict()
+    for weight, path in zip(weights, paths):
+        edges = frozenset(path)
+        merged[edges] = (merged[edges][0] + weight, merged[edges][1]) if edges in merged else (weight, path)
+
+    return [weight for weight, _ in merged.values()], [path for _, path in merged.values()]
+
+
+def reduce_decomposition(weights, paths, size, fixed=0):
+
+    weights, paths = merge_equal_paths(weights, paths)
+    if len(paths) <= size:
+        return (weights, paths) if len(paths) == size else None
+
+    # at least one path of the start is left to the solver
+    kept, rest = list(), sum(weights[fixed:])
+    for k in sorted(range(fixed, len(paths)), key=lambda k: -weights[k]):
+        rest -= weights[k]
+        if weights[k] <= rest or fixed + len(kept) >= size - 1:
+            break
+        kept.append(k)
+
+    if fixed + len(kept) == 0 or fixed >= size:
+        return None
+
+    kept = list(range(fixed)) + sorted(kept)
+    return [weights[k] for k in kept], [paths[k] for k in kept]
+
+
+def start_decomposition(data, size, reduce=False, symmetry=()):
+
+    # the decomposition with the fewest paths, but at least size, among the known ones
+    known = [data.get('greedy')]
+    best = data.get('search', dict()).get('best')
+    if reduce and best is not None:
+        known.append((best[1], best[2]))
+    known = [d for d in known if d and (len(d[1]) == size or reduce and len(d[1]) > size)]
+    if not known:
+        return None
+
+    weights, paths = min(known, key=lambda d: len(d[1]))
+    if len(paths) == size:
+        return weights, paths
+
+    decomposition = reduce_decomposition(weights, paths, size, first_free_path(data))
+    if decomposition is not None and symmetry:
+        decomposition = sort_paths(data, *decomposition, symmetry)
+
+    return decomposition
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'MFD in DAGS'))
+import mfd_pc
+from mfd_backend import BACKENDS, backend_available
+from mfd_generate import random_flows, format_graph
+from benchmark_backends import read_examples
+
+## Solve times of the formulations of mfd_pc.py (see its --formulation) on the example
+## graph with cycles of the repository and on random flows with cycles. Every instance
+## is solved with mfd_pc.mfd_algorithm once per formulation, and a line
+##   instance formulation paths total build solve cuts
+## is written per solve, with the times in seconds (build and solve summed over all
+## the sizes tried by the search) and the number of lazy cuts (- without them). With a
+## graph time limit, a graph that reaches it is written with paths None. The total time
+## of every formulation, and the number of instances where it is the fastest, are
+## printed at the end. The formulations may find different numbers of paths (reach
+## accepts fewer cycles, see the --formulation help of mfd_pc.py): such instances are
+## reported and left out of the count of the fastest formulation, whose times would
+## then be for different problems.
+
+EXAMPLE = 'Version 1.0/Example/Cycle/example.graph'
+
+
+def instances(seed, generated, nodes, paths, cycles):
+
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for g, raw_graph in enumerate(read_examples(os.path.join(folder, EXAMPLE))):
+        yield f'Cycle/example.graph:{g}', raw_graph
+
+    for g, graph in enumerate(random_flows(seed, generated, nodes, paths, max_weight=30, cycles=cycles)):
+        yield f'random-{seed}-{g}', format_graph(graph)
+
+
+def solve(raw_graph, backend, threads, formulation, graph_time_limit):
+
+    mfd_pc.backend, mfd_pc.threads, mfd_pc.formulation, mfd_pc.graph_time_limit = backend, threads, formulation, graph_time_limit
+    data = mfd_pc.compute_graph_metadata(mfd_pc.get_graph(raw_graph))
+
+    start = time.perf_counter()
+    data = mfd_pc.mfd_algorithm(data)
+    total = time.perf_counter() - start
+
+    paths = len(data['solution']) if data['message'] == 'solved' else None
+    return paths, total, sum(t[1] for t in data['timings']), sum(t[2] for t in data['timings']), data.get('cuts', '-')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='''
+        Compares the solve times of the formulations of the ILP for paths and cycles on the example graph and on random flows with cycles.
+        ''',
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument('-fm', '--formulations', type=str, nargs='+', default=mfd_pc.FORMULATIONS, choices=mfd_pc.FORMULATIONS,
+                        help='Formulations to compare (default all).')
+    parser.add_argument('-b', '--backend', type=str, default='gurobi', choices=BACKENDS,
+                        help='ILP solver (default gurobi).')
+    parser.add_argument('-g', '--generated', type=int, default=20,
+                        help='Number of random flows (default 20).')
+    parser.add_argument('-n', '--nodes', type=int, default=20,
+                        help='Number of nodes of the random flows (default 20).')
+    parser.add_argument('-k', '--paths', type=int, default=6,
+                        help='Largest number of random paths summed into a random flow (default 6).')
+    parser.add_argument('-c', '--cycles', type=int, default=3,
+                        help='Number of random cycles summed into a random flow (default 3).')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='Seed of the random flows (default 0).')
+    parser.add_argument('-t', '--threads', type=int, default=1,
+                        help='Number of threads to use for each ILP solve (default 1).')
+    parser.add_argument('-gtl', '--graph-time-limit', type=float,
+                        help='Time limit in seconds for each graph (default none).')
+    parser.add_argument('-o', '--output', type=str,
+                        help='Output filename (default standard output).')
+
+    args = parser.parse_args()
+    if not backend_available(args.backend):
+        parser.error(f'the {args.backend} backend is not installed')
+
+    output = open(args.output, 'w+') if args.output else sys.stdout
+    output.write('instance formulation paths total build solve cuts\n')
+
+    totals = {formulation: 0 for formulation in args.formulations}
+    fastest = {formulation: 0 for formulation in args.formulations}
+    mismatches = 0
+    for name, raw_graph in instances(args.seed, args.generated, args.nodes, args.paths, args.cycles):
+        times, sizes = dict(), dict()
+        for formulation in args.formulations:
+            paths, total, build, solve_time, cuts = solve(raw_graph, args.backend, args.threads, formulation, args.graph_time_limit)
+            totals[formulation] += total
+            if paths is not None:
+                times[formulation], sizes[formulation] = total, paths
+            output.write(f'{name} {formulation} {paths} {total:.4f} {build:.4f} {solve_time:.4f} {cuts}\n')
+        if len(set(sizes.values())) > 1:
+            mismatches += 1
+            print(f"INFO: {name} solved with different numbers of paths: {' '.join(f'{formulation} {paths}' for formulation, paths in sizes.items())}", file=sys.stderr)
+        elif times:
+            fastest[min(times, key=times.get)] += 1
+        output.flush()
+
+    for formulation in args.formulations:
+        print(f'INFO: {formulation} {totals[formulation]:.2f} s in total, fastest on {fastest[formulation]} instances', file=sys.stderr)
+    if mismatches:
+        print(f'INFO: {mismatches} instances left out of the fastest counts, the formulations found different numbers of paths', file=sys.stderr)
+
+    if args.output:
+        output.close()
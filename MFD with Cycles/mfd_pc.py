@@ -3,14 +3,50 @@
 
 import os
 import sys
+import time
 import argparse
 import networkx as nx
-import gurobipy as gp
-from gurobipy import GRB
-from collections import deque
+from collections import deque, Counter
 from bisect import bisect
 from copy import deepcopy
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'MFD in DAGS'))
+import mfd_standard
+from mfd_backend import GRB, new_model, empty_expression, backend_available, SOLVER_ERRORS, BACKENDS
+from mfd_bounds import lower_bound, greedy_decomposition, largest_size, flow_bounds, LINEARIZATIONS
+from mfd_search import search_size, solve_budget, SEARCH_STRATEGIES
+from mfd_batch import map_graphs, read_blocks
+from mfd_symmetry import add_symmetry_constraints, sort_greedy, SYMMETRY_BREAKING
+from mfd_matrix import conservation_block, linearization_block, sparse_block, add_block, variable_names, stack
+from mfd_solution import extract_paths, extract_walks, get_values, used_edges
+from mfd_cache import graph_key, load_result, store_result
+from mfd_warmstart import start_decomposition
+from mfd_components import map_components
+
+# ways to exclude cycles from a path, and to have a cycle go through one node only, see --formulation
+FORMULATIONS = ['order', 'reach', 'tour']
+
+# elements of the decomposition, see --decomposition
+DECOMPOSITIONS = ['paths', 'trails', 'walks']
+
+# options passed on to mfd_standard.py for the graphs without cycles, see dag_algorithm
+DAG_OPTIONS = ['backend', 'threads', 'incremental', 'search_strategy', 'time_limit', 'graph_time_limit', 'symmetry', 'matrix', 'linearization', 'warm_start']
+
+backend = 'gurobi'
+incremental = False
+search_strategy = 'binary'
+time_limit = None
+graph_time_limit = None
+symmetry = list()
+matrix = False
+linearization = 'edge'
+formulation = 'order'
+decomposition = 'paths'
+warm_start = False
+cache = None
+cache_size = 10000
+components = False
+
 def get_edge(raw_edge):
 
     parts = raw_edge.split()
@@ -33,105 +69,440 @@ def get_graph(raw_graph):
         return graph
 
 
-def read_input_graphs(graph_file):
+def stream_input_graphs(graph_file):
 
-    graphs_raw = open(graph_file, 'r').read().split('#')[1:]
-    return [get_graph(raw_g) for raw_g in graphs_raw]
+    for raw_g in read_blocks(graph_file):
+        yield get_graph(raw_g)
 
 def read_input(graph_file):
 
-    return read_input_graphs(graph_file)
+    return stream_input_graphs(graph_file)
+
+
+def dag_algorithm(data):
+
+    # a graph without cycles, from one source to one sink, is decomposed into paths by
+    # the DAG solver with the same options (it needs every path to go from the source to
+    # the sink, so graphs with several sources or sinks stay here)
+    for option in DAG_OPTIONS:
+        setattr(mfd_standard, option, globals()[option])
+    dag = mfd_standard.mfd_algorithm(mfd_standard.compute_graph_metadata({'edges': list(data['graph'].edges(data='flow'))}))
+
+    for key in ['runtime', 'message', 'timings', 'search', 'lower_bound', 'weights']:
+        data[key] = dag[key]
+    data['solution'] = [[(u, v) for u, v, _ in path] for path in dag['solution']]
+
+    return data
+
+
+def element_formulation():
+
+    # trails and walks are kept connected by the reach flow, without the edges into every node
+    return formulation if decomposition == 'paths' else 'euler'
 
 
 def mfd_algorithm(data):
 
-    data['message'] = 'unsolved'
-    for i in range(2, len(data['graph'].edges) + 1):
-        if fd_fixed_size(data, i)['message'] == 'solved':
-            return data
+    if element_formulation() == 'tour':
+        data['cuts'] = 0
+    # no order is needed without cycles, see dag_algorithm
+    if not data['cycle nodes'] and len(data['sources']) == 1 and len(data['sinks']) == 1:
+        return dag_algorithm(data)
 
+    data['message'] = 'unsolved'
+    data['timings'] = list()
+    data['deadline'] = time.perf_counter() + graph_time_limit if graph_time_limit is not None else None
+    data['flow bounds'] = flow_bounds(data, linearization, cycles=True)
+    data['greedy'] = greedy_decomposition(data, cycles=True)
+    upper = len(data['greedy'][1]) if data['greedy'] else None
+    if symmetry:
+        sort_greedy(data, symmetry)
+    search_size(data, fd_fixed_size, lower_bound(data, decomposition), upper, search_strategy, largest_size(data, cycles=True))
+
+    release_ilp_model(data)
     return data
 
 
-def build_base_ilp_model(data, size):
+def create_ilp_model(data):
 
     graph = data['graph']
-    max_flow_value = data['max_flow_value']
-    sources = data['sources']
-    nodes = data['nodes']
-    sinks = data['sinks']
-
-    # create extra sets
-    T = [(u, v, k) for (u, v) in graph.edges() for k in range(size)]
-    SC = list(range(size))
-    ST = [(i,k) for i in nodes for k in range(size)]
 
     # Create a new model
-    model = gp.Model('MFD')
+    model = new_model('MFD', backend)
     model.setParam('LogToConsole', 0)
     model.setParam('Threads', threads)
 
+    # flow superposition, the z variables of each path are added to these rows by add_path
+    balance = {(u, v): model.addConstr(empty_expression(model) == f) for (u, v, f) in graph.edges(data='flow')}
+
+    return {
+        'model': model,
+        'size': 0,
+        'x': dict(),
+        'w': dict(),
+        'z': dict(),
+        'c': dict(),
+        't': dict(),
+        'phi': dict(),
+        'xb': dict(),
+        'zb': dict(),
+        'balance': balance,
+        'path_constrs': list(),
+    }
+
+
+def add_path(ilp, data):
 
-    # Create variables
-    x = model.addVars(T, vtype=GRB.BINARY, name='x')
-    w = model.addVars(SC, vtype=GRB.INTEGER, name='w', lb=1)
-    z = model.addVars(T, vtype=GRB.CONTINUOUS, name='z', lb=0)
-    c = model.addVars(ST,vtype=GRB.BINARY, name="c")
-    t = model.addVars(ST,vtype=GRB.CONTINUOUS,name="t")
+    graph = data['graph']
+    edge_bound, weight_bound = data['flow bounds']
+    sources = data['sources']
+    nodes = data['cycle nodes']
+    sinks = data['sinks']
+    cycle_edges = data['cycle edges']
+    bits = walk_bits(data)
+    scheme = element_formulation()
+    model, x, z, c, t, phi = ilp['model'], ilp['x'], ilp['z'], ilp['c'], ilp['t'], ilp['phi']
+    xb, zb = ilp['xb'], ilp['zb']
+    k = ilp['size']
+
+    # create extra sets, the order (or reach) variables only for the nodes and edges of the cycles
+    T = [(u, v, k) for (u, v) in graph.edges()]
+    ST = [(i,k) for i in nodes] if scheme != 'tour' else list()
+    TT = [(u, v, k) for (u, v) in cycle_edges] if scheme in ['reach', 'euler'] else list()
+    BT = [(u, v, b, k) for (u, v), n in bits.items() for b in range(n)]
+
+    # Create variables, x is the number of times a walk uses an edge
+    x.update(model.addVars(T, vtype=GRB.INTEGER if decomposition == 'walks' else GRB.BINARY, name='x'))
+    w = ilp['w'][k] = model.addVar(vtype=GRB.INTEGER, name=f'w[{k}]', lb=1, ub=weight_bound)
+    z.update(model.addVars(T, vtype=GRB.CONTINUOUS, name='z', lb=0))
+    c.update(model.addVars(ST,vtype=GRB.BINARY, name="c"))
+    t.update(model.addVars(ST if scheme == 'order' else list(),vtype=GRB.CONTINUOUS,name="t"))
+    phi.update(model.addVars(TT,vtype=GRB.CONTINUOUS,name="phi",lb=0))
+    xb.update(model.addVars(BT, vtype=GRB.BINARY, name='xb'))
+    zb.update(model.addVars(BT, vtype=GRB.CONTINUOUS, name='zb', lb=0))
+    constrs = list()
 
     # flow conservation
-    for k in range(size):
-        for v in graph.nodes:
-            if v in sources:
-                model.addConstr(sum(x[v, w, k] for _, w in graph.out_edges(v)) <= 1)
-            if v in sinks:
-                model.addConstr(sum(x[u, v, k] for u, _ in graph.in_edges(v)) <= 1)
-            if v not in sources and v not in sinks:
-                model.addConstr(sum(x[v, w, k] for _, w  in graph.out_edges(v)) - sum(x[u, v, k] for u, _ in graph.in_edges(v)) == 0)
+    for v in graph.nodes:
+        if v in sources:
+            constrs.append(model.addConstr(sum(x[v, y, k] for _, y in graph.out_edges(v)) <= 1))
+        if v in sinks:
+            constrs.append(model.addConstr(sum(x[u, v, k] for u, _ in graph.in_edges(v)) <= 1))
+        if v not in sources and v not in sinks:
+            constrs.append(model.addConstr(sum(x[v, y, k] for _, y  in graph.out_edges(v)) - sum(x[u, v, k] for u, _ in graph.in_edges(v)) == 0))
 
     # flow superposition
-    for (u, v, f) in graph.edges(data='flow'):
-        model.addConstr(f - sum(z[u, v, k] for k in range(size)) == 0)
+    for (u, v) in graph.edges():
+        model.chgCoeff(ilp['balance'][u, v], z[u, v, k], 1)
 
-    # linearization
+    # linearization, with indicator constraints for w - (1 - x) W <= z <= w (the edges
+    # a walk may use several times are linearized bit by bit below)
     for (u, v) in graph.edges():
-        for k in range(size):
-            model.addConstr(z[u, v, k] <= max_flow_value * x[u, v, k])
-            model.addConstr(w[k] - (1 - x[u, v, k]) * max_flow_value <= z[u, v, k])
-            model.addConstr(z[u, v, k] <= w[k])
-
-    # order sequence
-    for (u,v) in graph.edges():
-        for k in range(size):
-            model.addConstr(t[v,k] >= t[u,k] + 1 + (len(nodes) - 1)*(x[u,v,k] - 1 - c[u,k]))
-    
-    # cycles and path definitions
-    for k in range(size):
-        #for u in sources:
-        #    for _,v in graph.out_edges(u):
-        #        print(u,v)
-        model.addConstr(sum(x[u,v,k] for u in sources for _,v in graph.out_edges(u)) + sum(c[u,k] for u in nodes) <= 1)
-        
-    return model, x, w, z
+        if (u, v) in bits:
+            continue
+        constrs.append(model.addConstr(z[u, v, k] <= edge_bound[u, v] * x[u, v, k]))
+        if linearization == 'indicator':
+            constrs.append(model.addGenConstrIndicator(x[u, v, k], True, z[u, v, k] - w == 0))
+        else:
+            constrs.append(model.addConstr(w - (1 - x[u, v, k]) * weight_bound <= z[u, v, k]))
+            constrs.append(model.addConstr(z[u, v, k] <= w))
+
+    # binary expansion of the number of times x of every edge of the cycles used by a
+    # walk, and of its flow z = w x: bit b of x carries 2^b w of flow, and at most
+    # the flow of the edge
+    for (u, v), n in bits.items():
+        constrs.append(model.addConstr(x[u, v, k] - sum(2**b * xb[u, v, b, k] for b in range(n)) == 0))
+        constrs.append(model.addConstr(z[u, v, k] - sum(2**b * zb[u, v, b, k] for b in range(n)) == 0))
+        for b in range(n):
+            constrs.append(model.addConstr(zb[u, v, b, k] <= edge_bound[u, v] / 2**b * xb[u, v, b, k]))
+            constrs.append(model.addConstr(w - (1 - xb[u, v, b, k]) * weight_bound <= zb[u, v, b, k]))
+            constrs.append(model.addConstr(zb[u, v, b, k] <= w))
+
+    if scheme == 'order':
+        # order sequence on the edges of the cycles, the size of their strongly connected
+        # component is a big-M for the order of its nodes
+        for (u,v), n in cycle_edges.items():
+            constrs.append(model.addConstr(t[v,k] >= t[u,k] + 1 + n*(x[u,v,k] - 1 - c[u,k])))
+
+    if scheme in ['reach', 'euler']:
+        # reach flow on the edges of the cycles, sent by the nodes where the path enters a
+        # strongly connected component (or by its node c, for a cycle) to every edge used
+        # in the component, once for every time it is used: a cycle of a path, or a cycle
+        # of a cycle not through c, is not reached. The flow is bounded by the number of
+        # times the edges of the component can be used, see reach_capacity
+        capacity = reach_capacity(data)
+        for (u,v) in cycle_edges:
+            constrs.append(model.addConstr(phi[u,v,k] <= capacity[u]*x[u,v,k]))
+        for v in nodes:
+            inner = [(u, v) for u, _ in graph.in_edges(v) if (u, v) in cycle_edges]
+            outer = [(u, v) for u, _ in graph.in_edges(v) if (u, v) not in cycle_edges]
+            out = [(v, y) for _, y in graph.out_edges(v) if (v, y) in cycle_edges]
+            constrs.append(model.addConstr(sum(phi[e + (k,)] for e in inner) - sum(phi[e + (k,)] for e in out) + capacity[v]*(c[v,k] + sum(x[e + (k,)] for e in outer)) >= sum(x[e + (k,)] for e in inner)))
+
+            # one edge into every node but c, trails and walks go through a node several
+            # times and are one piece as soon as they are reached (Euler)
+            if scheme == 'reach' and graph.in_degree(v) > 1:
+                constrs.append(model.addConstr(sum(x[u,v,k] for u, _ in graph.in_edges(v)) - (graph.in_degree(v) - 1)*c[v,k] <= 1))
+
+    if scheme != 'tour':
+        # cycles and path definitions
+        constrs.append(model.addConstr(sum(x[u,v,k] for u in sources for _,v in graph.out_edges(u)) + sum(c[u,k] for u in nodes) <= 1))
+
+    else:
+        # one path at most (none in a graph of cycles), its cycles are cut by tour_cuts
+        start = [x[u,v,k] for u in sources for _,v in graph.out_edges(u)]
+        if start:
+            constrs.append(model.addConstr(sum(start) <= 1))
+
+    # symmetry breaking with path k - 1
+    if symmetry:
+        constrs += add_symmetry_constraints(model, data, x, ilp['w'], k, symmetry)
+
+    ilp['path_constrs'].append(constrs)
+    ilp['size'] += 1
+
+    return ilp
+
+
+def reach_capacity(data):
+
+    # for every node of the cycles, the number of times a path, trail or walk can use
+    # the edges of its strongly connected component: twice its size for a path or cycle
+    # (every node but c is entered once), its edges for a trail, and the flow of its
+    # edges for a walk (w is at least 1)
+    if decomposition == 'paths':
+        return {v: 2 * n for v, n in data['cycle nodes'].items()}
+
+    edge_bound, _ = data['flow bounds']
+    component = data['cycle component']
+    used = dict()
+    for (u, v) in data['cycle edges']:
+        used[component[u]] = used.get(component[u], 0) + (int(edge_bound[u, v]) if decomposition == 'walks' else 1)
+
+    return {v: used[component[v]] for v in data['cycle nodes']}
+
+
+def walk_bits(data):
+
+    # the number of bits of the number of times a walk uses every edge of the cycles,
+    # the only edges a walk can use more than once
+    if decomposition != 'walks':
+        return dict()
+
+    edge_bound, _ = data['flow bounds']
+    return {e: int(edge_bound[e]).bit_length() for e in data['cycle edges']}
+
+
+def order_block(data):
+
+    # over x (m edges), c and t (of the n nodes of the cycles) of a path: the order
+    # sequence of every edge of the cycles, then the path or cycle row
+    graph = data['graph']
+    nodes = data['cycle nodes']
+    cycle_edges = data['cycle edges']
+    m, n = len(graph.edges), len(nodes)
+    edge = {e: j for j, e in enumerate(graph.edges())}
+    node = {v: j for j, v in enumerate(nodes)}
+
+    rows = [[(m + n + node[v], 1), (m + n + node[u], -1), (edge[u, v], -size), (m + node[u], size)] for (u, v), size in cycle_edges.items()]
+    rows.append([(edge[u, v], 1) for u in data['sources'] for _, v in graph.out_edges(u)] + [(m + node[u], 1) for u in nodes])
+
+    return sparse_block(rows, m + 2 * n, ['>'] * len(cycle_edges) + ['<'], [1 - size for size in cycle_edges.values()] + [1])
+
+def reach_block(data):
+
+    # over x (m edges), c (of the n nodes of the cycles) and phi (of the l edges of the
+    # cycles) of a path: the bound of the reach flow of every edge of the cycles, the
+    # reach flow and (for paths) the edges into every node of the cycles, then the path
+    # or cycle row
+    graph = data['graph']
+    nodes = data['cycle nodes']
+    cycle_edges = data['cycle edges']
+    capacity = reach_capacity(data)
+    m, n, l = len(graph.edges), len(nodes), len(cycle_edges)
+    edge = {e: j for j, e in enumerate(graph.edges())}
+    node = {v: j for j, v in enumerate(nodes)}
+    flow = {e: j for j, e in enumerate(cycle_edges)}
+
+    rows = [[(m + n + flow[u, v], 1), (edge[u, v], -capacity[u])] for (u, v) in cycle_edges]
+    sense, rhs = ['<'] * l, [0] * l
+    for v in nodes:
+        in_edges = list(graph.in_edges(v))
+        rows.append([(m + n + flow[e], 1) for e in in_edges if e in cycle_edges] + [(m + n + flow[v, y], -1) for _, y in graph.out_edges(v) if (v, y) in cycle_edges]
+                    + [(m + node[v], capacity[v])] + [(edge[e], capacity[v]) for e in in_edges if e not in cycle_edges] + [(edge[e], -1) for e in in_edges if e in cycle_edges])
+        sense.append('>')
+        rhs.append(0)
+        if decomposition == 'paths' and len(in_edges) > 1:
+            rows.append([(edge[e], 1) for e in in_edges] + [(m + node[v], 1 - len(in_edges))])
+            sense.append('<')
+            rhs.append(1)
+
+    rows.append([(edge[u, v], 1) for u in data['sources'] for _, v in graph.out_edges(u)] + [(m + node[u], 1) for u in nodes])
+
+    return sparse_block(rows, m + n + l, sense + ['<'], rhs + [1])
+
+def source_block(data):
+
+    # over x (m edges) of a path: one edge out of the sources at most, no row without sources
+    graph = data['graph']
+    edge = {e: j for j, e in enumerate(graph.edges())}
+    rows = [[(edge[u, v], 1) for u in data['sources'] for _, v in graph.out_edges(u)]]
+    rows = [row for row in rows if row]
+
+    return sparse_block(rows, len(edge), ['<'] * len(rows), [1] * len(rows))
+
+def bits_block(data):
+
+    # over x, z (m edges), w, xb and zb (the bits of the edges of the cycles) of a walk:
+    # the binary expansion of x and z of every edge of the cycles, and the linearization
+    # of every bit, as in add_path
+    graph = data['graph']
+    edge_bound, weight_bound = data['flow bounds']
+    bits = walk_bits(data)
+    m, nb = len(graph.edges), sum(bits.values())
+    edge = {e: j for j, e in enumerate(graph.edges())}
+
+    rows, sense, rhs = list(), list(), list()
+    first = 0
+    for e, n in bits.items():
+        xb, zb = [2 * m + 1 + first + b for b in range(n)], [2 * m + 1 + nb + first + b for b in range(n)]
+        rows += [[(edge[e], 1)] + [(xb[b], -2**b) for b in range(n)], [(m + edge[e], 1)] + [(zb[b], -2**b) for b in range(n)]]
+        sense += ['=', '=']
+        rhs += [0, 0]
+        for b in range(n):
+            rows += [[(zb[b], 1), (xb[b], -edge_bound[e] / 2**b)], [(2 * m, 1), (xb[b], weight_bound), (zb[b], -1)], [(zb[b], 1), (2 * m, -1)]]
+            sense += ['<', '<', '<']
+            rhs += [0, weight_bound, 0]
+        first += n
+
+    return sparse_block(rows, 2 * m + 1 + 2 * nb, sense, rhs)
+
+def path_blocks(data):
+
+    graph = data['graph']
+    edge_bound, weight_bound = data['flow bounds']
+    bits = walk_bits(data)
+    return {
+        'conservation': conservation_block(graph, data['sources'], data['sinks'], '<'),
+        'linearization': linearization_block([edge_bound[e] for e in graph.edges()], weight_bound, linearization == 'indicator', [e in bits for e in graph.edges()]),
+        'bits': bits_block(data),
+        'order': {'order': order_block, 'reach': reach_block, 'euler': reach_block, 'tour': source_block}[element_formulation()](data),
+    }
+
+def add_path_matrix(ilp, data):
+
+    graph = data['graph']
+    nodes = data['cycle nodes']
+    scheme = element_formulation()
+    model, x, z, c, t, phi = ilp['model'], ilp['x'], ilp['z'], ilp['c'], ilp['t'], ilp['phi']
+    k = ilp['size']
+    if 'blocks' not in data:
+        data['blocks'] = path_blocks(data)
+    blocks = data['blocks']
+    _, weight_bound = data['flow bounds']
+
+    # create extra sets
+    T = [(u, v, k) for (u, v) in graph.edges()]
+    ST = [(i,k) for i in nodes] if scheme != 'tour' else list()
+    OT = ST if scheme == 'order' else list()
+    TT = [(u, v, k) for (u, v) in data['cycle edges']] if scheme in ['reach', 'euler'] else list()
+    BT = [(u, v, b, k) for (u, v), n in walk_bits(data).items() for b in range(n)]
+
+    # Create variables, named as in add_path
+    xk = model.addMVar(len(T), vtype=GRB.INTEGER if decomposition == 'walks' else GRB.BINARY, name=variable_names('x', T))
+    w = ilp['w'][k] = model.addVar(vtype=GRB.INTEGER, name=f'w[{k}]', lb=1, ub=weight_bound)
+    zk = model.addMVar(len(T), vtype=GRB.CONTINUOUS, name=variable_names('z', T), lb=0)
+    ck = model.addMVar(len(ST), vtype=GRB.BINARY, name=variable_names('c', ST))
+    tk = model.addMVar(len(OT), vtype=GRB.CONTINUOUS, name=variable_names('t', OT))
+    phik = model.addMVar(len(TT), vtype=GRB.CONTINUOUS, name=variable_names('phi', TT), lb=0)
+    xbk = model.addMVar(len(BT), vtype=GRB.BINARY, name=variable_names('xb', BT))
+    zbk = model.addMVar(len(BT), vtype=GRB.CONTINUOUS, name=variable_names('zb', BT), lb=0)
+    x.update(zip(T, xk.tolist()))
+    z.update(zip(T, zk.tolist()))
+    c.update(zip(ST, ck.tolist()))
+    t.update(zip(OT, tk.tolist()))
+    phi.update(zip(TT, phik.tolist()))
+    ilp['xb'].update(zip(BT, xbk.tolist()))
+    ilp['zb'].update(zip(BT, zbk.tolist()))
+
+    # flow conservation
+    constrs = [add_block(model, blocks['conservation'], xk)]
+
+    # flow superposition
+    for (u, v) in graph.edges():
+        model.chgCoeff(ilp['balance'][u, v], z[u, v, k], 1)
+
+    # linearization, with indicator constraints for w - (1 - x) W <= z <= w
+    constrs.append(add_block(model, blocks['linearization'], stack(xk, zk, w)))
+    if linearization == 'indicator':
+        constrs += [model.addGenConstrIndicator(xe, True, ze - w == 0) for xe, ze in zip(xk.tolist(), zk.tolist())]
+
+    # binary expansion of the edges of the cycles used by a walk
+    if BT:
+        constrs.append(add_block(model, blocks['bits'], stack(xk, zk, w, xbk, zbk)))
+
+    # order sequence (or reach flow), cycles and path definitions
+    constrs.append(add_block(model, blocks['order'], {'order': stack(xk, ck, tk), 'reach': stack(xk, ck, phik), 'euler': stack(xk, ck, phik), 'tour': xk}[scheme]))
+
+    # symmetry breaking with path k - 1
+    if symmetry:
+        constrs += add_symmetry_constraints(model, data, x, ilp['w'], k, symmetry)
+
+    ilp['path_constrs'].append(constrs)
+    ilp['size'] += 1
+
+    return ilp
+
+
+def remove_path(ilp):
+
+    model, x, z, c, t, phi = ilp['model'], ilp['x'], ilp['z'], ilp['c'], ilp['t'], ilp['phi']
+    k = ilp['size'] - 1
 
+    # removing the z variables also drops them from the superposition rows
+    T = [e for e in x if e[-1] == k]
+    ST = [e for e in c if e[-1] == k]
+    OT = [e for e in t if e[-1] == k]
+    TT = [e for e in phi if e[-1] == k]
+    BT = [e for e in ilp['xb'] if e[-1] == k]
+    model.remove([x.pop(e) for e in T] + [z.pop(e) for e in T] + [c.pop(e) for e in ST] + [t.pop(e) for e in OT] + [phi.pop(e) for e in TT]
+                 + [ilp['xb'].pop(e) for e in BT] + [ilp['zb'].pop(e) for e in BT] + [ilp['w'].pop(k)])
+    model.remove(ilp['path_constrs'].pop())
+    ilp['size'] -= 1
 
-def get_solution(model, data, size):
+    return ilp
+
+
+def resize_ilp_model(ilp, data, size):
+
+    while ilp['size'] < size:
+        (add_path_matrix if matrix else add_path)(ilp, data)
+    while ilp['size'] > size:
+        remove_path(ilp)
+    ilp['model'].update()
+
+    return ilp
+
+
+def release_ilp_model(data):
+
+    if 'ilp' in data:
+        data.pop('ilp')['model'].dispose()
+    data.pop('blocks', None)
+
+
+def build_base_ilp_model(data, size):
+
+    ilp = resize_ilp_model(create_ilp_model(data), data, size)
+    return ilp['model'], ilp['x'], ilp['w'], ilp['z']
+
+
+def get_solution(model, data, x, w, size):
 
     data['weights'], data['solution'] = list(), list()
 
     if model.status == GRB.OPTIMAL:
-        graph = data['graph']
-        T = [(u, v, k) for (u, v) in graph.edges() for k in range(size)]
-
-        w_sol = [0] * len(range(size))
-        paths = [list() for _ in range(size)]
-        for k in range(size):
-            w_sol[k] = round(model.getVarByName(f'w[{k}]').x)
-        for (u, v, k) in T:
-            if round(model.getVarByName(f'x[{u},{v},{k}]').x) == 1:
-                paths[k].append((u, v))
-   
-        data['weights'], data['solution'] = w_sol, paths
+        data['weights'], data['solution'] = (extract_paths if decomposition == 'paths' else extract_walks)(model, data, x, w, size)
 
     return data
 
@@ -142,27 +513,177 @@ def update_status(data, model):
         data['message'] = 'solved'
         data['runtime'] = model.Runtime
 
-    if model.status == GRB.INFEASIBLE:
-        data['message'] = 'unsolved'
+    # without an objective the model is never unbounded, so both prove the size infeasible;
+    # any other status leaves the message unsolved, which the search does not take as a proof
+    if model.status in (GRB.INFEASIBLE, GRB.INF_OR_UNBD):
+        data['message'] = 'infeasible'
         data['runtime'] = 0
 
+    if model.status == GRB.TIME_LIMIT:
+        data['message'] = 'timeout'
+
     return data
 
 
+def set_mip_start(x, w, z, weights, paths):
+
+    # the paths after the given ones are left for the solver to complete, a walk uses an
+    # edge as many times as it is listed
+    paths = [Counter(path) for path in paths]
+    for k in w:
+        w[k].Start = weights[k] if k < len(paths) else GRB.UNDEFINED
+    for e in x:
+        if e[-1] < len(paths):
+            used = paths[e[-1]][e[:-1]]
+            x[e].Start = used
+            z[e].Start = weights[e[-1]] * used
+        else:
+            x[e].Start = z[e].Start = GRB.UNDEFINED
+
+
+def tour_cuts(data, used):
+
+    # cuts ([(edge, coefficient)], right-hand side) violated by the edges used by some
+    # path: a path (out of a source) is connected and has no cycle, and a cycle is
+    # connected and all its cycles go through one node. A cut holds for every path, and
+    # it is added to all of them, so that the solver does not meet it again with the
+    # paths swapped
+    graph, sources = data['graph'], data['sources']
+    start = [(u, v) for u in sources for _, v in graph.out_edges(u)]
+    cuts = list()
+    for edges in used:
+        support = nx.DiGraph(edges)
+        parts = sorted(nx.weakly_connected_components(support), key=min)
+        path = any(u in sources for u, _ in edges)
+
+        # a node of a part without sources is only used, by a path or together with a
+        # node of another part by a cycle, if an edge enters the part
+        if len(parts) > 1:
+            for part in parts[0 if path else 1:]:
+                if path and any(v in sources for v in part):
+                    continue
+                used_nodes = [min(part)] if path else [min(part), min(parts[0])]
+                entering = [((u, v), -1) for v in part for u, _ in graph.in_edges(v) if u not in part]
+                used_edges = [((u, v), 1) for node in used_nodes for u, v in graph.in_edges(node)] + ([(e, 1) for e in start] if path else list())
+                cuts.append((used_edges + entering, 1))
+            continue
+
+        try:
+            cycle = nx.find_cycle(support)
+        except nx.NetworkXNoCycle:
+            continue
+
+        # a path has no cycle
+        if path:
+            cuts.append(([(e, 1) for e in cycle + start], len(cycle)))
+            continue
+
+        # cycles without a common node are not one cycle
+        cycles, common = [cycle], {u for u, _ in cycle}
+        while common:
+            hub = min(common)
+            try:
+                cycle = nx.find_cycle(support.subgraph(v for v in support if v != hub))
+            except nx.NetworkXNoCycle:
+                break
+            cycles.append(cycle)
+            common &= {u for u, _ in cycle}
+        else:
+            union = sorted({e for cycle in cycles for e in cycle})
+            cuts.append(([(e, 1) for e in union], len(union) - 1))
+
+    return cuts
+
+
+def tour_callback(ilp, data):
+
+    x = ilp['x']
+    keys = list(x)
+
+    def callback(model, where):
+        if where == GRB.Callback.MIPSOL:
+            values = dict(zip(keys, model.cbGetSolution([x[e] for e in keys])))
+            for terms, rhs in tour_cuts(data, used_edges(values, ilp['size'])):
+                for k in range(ilp['size']):
+                    model.cbLazy(sum(a * x[u, v, k] for (u, v), a in terms) <= rhs)
+                data['cuts'] += 1
+
+    return callback
+
+
+def optimize_tours(ilp, data, budget):
+
+    # with --formulation tour the cycles of the paths are cut lazily: from a MIPSOL
+    # callback with gurobi, or else by adding the cuts of every solution and solving
+    # again; returns the solve time and whether the last solution still needs cuts
+    model, x = ilp['model'], ilp['x']
+    if backend == 'gurobi':
+        model.setParam('LazyConstraints', 1)
+        model.optimize(tour_callback(ilp, data))
+        return model.Runtime, False
+
+    model.optimize()
+    solve_time = model.Runtime
+    cuts = tour_cuts(data, used_edges(get_values(model, x), ilp['size'])) if model.status == GRB.OPTIMAL else list()
+    while cuts and (budget is None or budget > solve_time):
+        for terms, rhs in cuts:
+            for k in range(ilp['size']):
+                ilp['path_constrs'][k].append(model.addConstr(sum(a * x[u, v, k] for (u, v), a in terms) <= rhs))
+        data['cuts'] += len(cuts)
+        if budget is not None:
+            model.setParam('TimeLimit', budget - solve_time)
+        model.optimize()
+        solve_time += model.Runtime
+        cuts = tour_cuts(data, used_edges(get_values(model, x), ilp['size'])) if model.status == GRB.OPTIMAL else list()
+
+    return solve_time, bool(cuts)
+
+
 def fd_fixed_size(data, size):
 
     # calculate a flow decomposition into size paths
+    data['message'] = 'unsolved'
+    budget = solve_budget(data, time_limit)
+    if budget is not None and budget <= 0:
+        data['message'] = 'timeout'
+        return data
+
     try:
-        # Create a new model
-        model, _, _, _ = build_base_ilp_model(data, size)
+        # Create a new model, or resize the one kept from the previous size
+        start = time.perf_counter()
+        if incremental:
+            if 'ilp' not in data:
+                data['ilp'] = create_ilp_model(data)
+            ilp = resize_ilp_model(data['ilp'], data, size)
+        else:
+            ilp = resize_ilp_model(create_ilp_model(data), data, size)
+        model, x, w, z = ilp['model'], ilp['x'], ilp['w'], ilp['z']
+
+        # warm start from the greedy decomposition when it has exactly size paths, or
+        # from a decomposition with more paths (see mfd_warmstart.py)
+        start_paths = start_decomposition(data, size, warm_start, symmetry)
+        if start_paths:
+            set_mip_start(x, w, z, *start_paths)
+        if budget is not None:
+            model.setParam('TimeLimit', budget)
+        build_time = time.perf_counter() - start
 
         # objective function
-        model.optimize()
+        if element_formulation() == 'tour':
+            solve_time, cut = optimize_tours(ilp, data, budget)
+        else:
+            model.optimize()
+            solve_time, cut = model.Runtime, False
 
+        start = time.perf_counter()
         data = update_status(data, model)
-        data = get_solution(model, data, size)
+        data = get_solution(model, data, x, w, size)
+        if cut:
+            # the time ran out before a solution without cuts was found
+            data['message'], data['weights'], data['solution'] = 'timeout', list(), list()
+        data['timings'].append((size, build_time, solve_time, time.perf_counter() - start))
 
-    except gp.GurobiError as e:
+    except SOLVER_ERRORS as e:
         print(f'Error code {e.errno}: {e}', file=sys.stderr)
 
     except AttributeError:
@@ -192,6 +713,45 @@ def output_paths(output,paths,weights):
 
         output.write('\n')
 
+def output_walks(output,walks,weights):
+
+    # the nodes of every trail or walk in the order it goes through them, a closed one
+    # ends at its first node
+    for walk, weight in zip(walks, weights):
+        output.write(f"{decomposition[:-1]}: {weight}")
+        for i in [walk[0][0]] + [v for _, v in walk] if walk else []:
+            output.write(' '.join(['',str(i)]))
+        output.write('\n')
+
+def output_lower_bound(output,data):
+
+    bound, name = data['lower_bound']
+    tight = 'tight' if len(data['solution']) == bound else 'not tight'
+    output.write(f'lower bound {name} {bound} {tight}\n')
+
+def output_search(output,data):
+
+    search = data['search']
+    output.write(f"search {search['strategy']} infeasible {search['infeasible']} feasible {search['feasible']}\n")
+    output.write(f"status {data['message']} lower {search['infeasible'] + 1} paths {len(data['solution'])}\n")
+
+def output_cuts(output,data):
+
+    output.write(f"cuts {data['cuts']}\n")
+
+def output_components(output,data):
+
+    output.write(f"components {data['components']}\n")
+
+def output_cache(output,data):
+
+    output.write(f"cache {data['cache']}\n")
+
+def output_timings(output,timings):
+
+    for (size,build_time,solve_time,extract_time) in timings:
+        output.write(f'{size} {build_time} {solve_time} {extract_time}\n')
+
 def compute_graph_metadata(graph):
 
     # creation of NetworkX Graph
@@ -203,6 +763,11 @@ def compute_graph_metadata(graph):
     sinks = [x for x in ngraph.nodes if ngraph.out_degree(x) == 0]
     nodes = list(ngraph.nodes)
 
+    # strongly connected components with a cycle (a self-loop for a single node): every
+    # cycle of the graph is inside one of them, so only their nodes and their edges, with
+    # the size of their component, need the order sequence (or the reach flow) of add_path
+    strong = [part for part in nx.strongly_connected_components(ngraph) if len(part) > 1 or ngraph.has_edge(*[min(part)] * 2)]
+    component = {v: j for j, part in enumerate(strong) for v in part}
 
     # definition of data
     return {
@@ -210,35 +775,77 @@ def compute_graph_metadata(graph):
         'sources': sources,
         'sinks': sinks,
         'nodes': nodes,
+        'cycle nodes': {v: len(strong[component[v]]) for v in nodes if v in component},
+        'cycle edges': {(u, v): len(strong[component[u]]) for (u, v) in ngraph.edges() if u in component and component[u] == component.get(v)},
+        'cycle component': {v: component[v] for v in nodes if v in component},
         'max_flow_value': max(ngraph.edges(data='flow'), key=lambda e: e[-1])[-1] if len(ngraph.edges) > 0 else -1,
     }
 
-def solve_instances(graphs,output_file, output_stats=False):
+def solve_graph(graph):
+
+    if not graph['edges']:
+        return None
+
+    mfd = compute_graph_metadata(graph)
+
+    if len(mfd['graph'].edges) == 0:
+        return None
+
+    # reach accepts fewer cycles than order and tour, so its results are cached apart
+    key = graph_key(f'cycles {formulation}' if decomposition == 'paths' else decomposition, graph['edges']) if cache else None
+    if key is None or not load_result(cache, key, mfd):
+        mfd = mfd_algorithm(mfd)
+        if key is not None:
+            store_result(cache, key, mfd, cache_size)
+    mfd.pop('graph')
+    return mfd
+
+
+def init_worker(options):
+
+    # the solver options are module globals, they are set again in every worker process
+    globals().update(options)
+
+
+def solve_instances(graphs,output_file, output_stats=False, jobs=1, options=None):
 
     output = open(output_file, 'w+')
     if output_stats:
         stats = open(f'{output_file}.stats', 'w+')
 
-    for g, graph in enumerate(graphs):
+    results = (map_components if components else map_graphs)(solve_graph, ((graph,) for graph in graphs), jobs, init_worker, (options or dict(),))
+    cache_counts = {'hit': 0, 'miss': 0}
+    for g, mfd in enumerate(results):
 
         output.write(f'# graph {g}\n')
         if output_stats:
             stats.write(f'# graph {g}\n')
 
-        if not graph['edges']:
-            continue
-
-        mfd = compute_graph_metadata(graph)
-
-        if output_stats:
-            is_unique_decomposition = True
-
-        if len(mfd['graph'].edges) > 0:
-
-            mfd = mfd_algorithm(mfd)
+        if mfd is not None:
             paths,weights = mfd['solution'],mfd['weights']
-            output_paths(output,paths,weights)
-
+            (output_paths if decomposition == 'paths' else output_walks)(output,paths,weights)
+            if 'cache' in mfd:
+                cache_counts[mfd['cache']] += 1
+            if mfd['message'] == 'timeout':
+                print(f"INFO: Time limit reached for graph {g}, {len(paths)} paths found, at least {mfd['search']['infeasible'] + 1} needed")
+            if output_stats:
+                output_lower_bound(stats,mfd)
+                output_search(stats,mfd)
+                if 'components' in mfd:
+                    output_components(stats,mfd)
+                if 'cache' in mfd:
+                    output_cache(stats,mfd)
+                if 'cuts' in mfd:
+                    output_cuts(stats,mfd)
+                output_timings(stats,mfd['timings'])
+
+        output.flush()
+
+
+    if cache:
+        print(f"INFO: Cache {cache_counts['hit']} hits, {cache_counts['miss']} misses")
+        if output_stats:
+            stats.write(f"# cache hits {cache_counts['hit']} misses {cache_counts['miss']}\n")
 
     output.close()
     if output_stats:
@@ -250,12 +857,45 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         description='''
         Computes paths for Path and Cycles Minimum Flow Decomposition.
-        This script uses the Gurobi ILP solver.
+        This script uses the Gurobi or the HiGHS ILP solver.
+        A graph without cycles, from one source to one sink, is solved as by mfd_standard.py.
         ''',
         formatter_class=argparse.RawTextHelpFormatter
     )
+    parser.add_argument('-b', '--backend', type=str, default='gurobi', choices=BACKENDS,
+                        help='ILP solver used to build and solve the models (default gurobi).')
     parser.add_argument('-t', '--threads', type=int, default=0,
-                        help='Number of threads to use for the Gurobi solver; use 0 for all threads (default 0).')
+                        help='Number of threads to use for each ILP solve; use 0 for all threads, or 1 thread per solve with --jobs (default 0).')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of graphs solved in parallel by a pool of processes; use 0 for one process per CPU (default 1).')
+    parser.add_argument('-inc', '--incremental', action='store_true',
+                        help='Keep one ILP model across sizes, adding or removing the variables and constraints of a single path at a time.')
+    parser.add_argument('-ss', '--search', type=str, default='binary', choices=SEARCH_STRATEGIES,
+                        help='Strategy to search the number of paths (default binary):\n   linear (every size from the lower bound up),\n   binary (bisect between the largest infeasible and the smallest feasible size),\n   galloping (doubling steps up from the lower bound, then bisect).')
+    parser.add_argument('-sb', '--symmetry', type=str, nargs='+', default=list(), choices=[sb for sb in SYMMETRY_BREAKING if sb != 'safe-paths'],
+                        help='Symmetry breaking between the paths (default none):\n   weights (non-increasing weights),\n   source-edge (non-decreasing index of the edge out of the source, lexicographic with weights).')
+    parser.add_argument('-mx', '--matrix', action='store_true',
+                        help='Build the constraints of every path from sparse matrices built once per graph (same model).')
+    parser.add_argument('-fm', '--formulation', type=str, default='order', choices=FORMULATIONS,
+                        help='How the paths are kept from having cycles, and the cycles from being several cycles (default order):\n   order (an order of the nodes of every path inside the strongly connected components with a cycle, except after one node of a cycle),\n   reach (a flow inside these components from the node where a path enters them, or from one node of a cycle, that reaches every edge used, with one edge into every other node; the cycles of a cycle share only that node, where order also accepts cycles sharing several nodes, so it may need more paths),\n   tour (no order, the cycles found in a solution are cut lazily: from a callback with gurobi, by solving again with highs).')
+    parser.add_argument('-dc', '--decomposition', type=str, default='paths', choices=DECOMPOSITIONS,
+                        help='Elements of the decomposition (default paths):\n   paths (paths and cycles, through every node at most once),\n   trails (through every edge at most once, but through the nodes of the cycles several times),\n   walks (through the edges of the cycles several times, the flow of an edge is the weight of a walk times the number of times it uses the edge);\n   trails and walks are kept connected by a reach flow of their own, without --formulation, and are written with their nodes in order, a closed one back to its first node.')
+    parser.add_argument('-ws', '--warm-start', action='store_true',
+                        help='Warm start every size from the smallest decomposition known with more paths: paths with the same edges are merged, or else only its heaviest paths are kept and the solver completes the start.')
+    parser.add_argument('-lz', '--linearization', type=str, default='edge', choices=LINEARIZATIONS,
+                        help='Linearization of the product of the weight and the edge variables of a path or cycle (default edge):\n   global (the largest flow value as big-M),\n   edge (the flow of every edge, and the largest flow as a bound on the weight, as big-M),\n   indicator (indicator constraints, gurobi only).')
+    parser.add_argument('-tl', '--time-limit', type=float,
+                        help='Time limit in seconds for each ILP solve (default none).')
+    parser.add_argument('-gtl', '--graph-time-limit', type=float,
+                        help='Time limit in seconds for each graph; when a limit is reached, the best decomposition known is output with status timeout (default none).')
+    parser.add_argument('-cc', '--components', action='store_true',
+                        help='Solve the weakly connected components of every graph separately (in parallel with --jobs) and output the union of their decompositions; the time limits apply to each component.')
+    parser.add_argument('-ch', '--cache', type=str,
+                        help='Folder of the cache of solved graphs; a graph already solved with the same flows (and subpaths) is read from it instead of solved (default no cache).')
+    parser.add_argument('-cs', '--cache-size', type=int, default=10000,
+                        help='Largest number of graphs kept in the cache, the least recently used are removed first (default 10000).')
+    parser.add_argument('-st', '--stats', action='store_true',
+                        help='Write the lower bound, the search, the lazy cuts and the model build, solve and solution extraction time of every size tried to OUTPUT.stats.')
     
  
     requiredNamed = parser.add_argument_group('required arguments')
@@ -263,11 +903,37 @@ if __name__ == '__main__':
     requiredNamed.add_argument('-o', '--output', type=str, help='Output filename', required=True)
 
     args = parser.parse_args()
-
+    if not backend_available(args.backend):
+        parser.error(f'the {args.backend} backend is not installed')
+    if args.linearization == 'indicator' and args.backend != 'gurobi':
+        parser.error('indicator constraints need the gurobi backend')
+    if args.decomposition != 'paths' and args.formulation != 'order':
+        parser.error('--formulation applies to paths only')
+    if args.decomposition == 'walks' and args.linearization == 'indicator':
+        parser.error('walks need the global or edge linearization')
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
     threads = args.threads
     if threads == 0:
-        threads = os.cpu_count()
-    print(f'INFO: Using {threads} threads for the Gurobi solver')
-
-    solve_instances(read_input(args.input),args.output)
+        threads = os.cpu_count() if jobs == 1 else 1
+    backend = args.backend
+    print(f'INFO: Using {threads} threads for the {backend} solver')
+    if jobs > 1:
+        print(f'INFO: Solving {jobs} graphs in parallel')
+    incremental = args.incremental
+    search_strategy = args.search
+    time_limit = args.time_limit
+    graph_time_limit = args.graph_time_limit
+    symmetry = args.symmetry
+    matrix = args.matrix
+    linearization = args.linearization
+    formulation = args.formulation
+    decomposition = args.decomposition
+    warm_start = args.warm_start
+    components = args.components
+    cache = args.cache
+    cache_size = args.cache_size
+    options = {'backend': backend, 'threads': threads, 'incremental': incremental, 'search_strategy': search_strategy, 'time_limit': time_limit, 'graph_time_limit': graph_time_limit, 'symmetry': symmetry, 'matrix': matrix, 'linearization': linearization, 'formulation': formulation, 'decomposition': decomposition, 'warm_start': warm_start, 'cache': cache, 'cache_size': cache_size, 'components': components}
+
+    solve_instances(read_input(args.input),args.output,args.stats,jobs,options)
     print("Done")